@@ -1,68 +1,445 @@
 import os
-import json
 import random
 import shutil
 import sqlite3
-import csv
-import yaml
+import hashlib
+import io
+import itertools
+import threading
+import time
 
-import mysql.connector
-from mysql.connector.pooling import MySQLConnectionPool
-import psycopg2
-import psycopg2.pool as pool
-from faker import Faker
+from DataExpansion.cache_instrucoes import CacheInstrucoes
+from DataExpansion.cache_resultados import CacheResultados
+from DataExpansion.instrumentacao import instrumentacao
+from DataExpansion.pool_conexoes import PoolConexoes
+
+# Drivers, yaml, numpy e Faker são importados só quando usados, para que importar o
+# pacote não pague o custo de backends que o db_type escolhido nunca vai usar
+_fake = None
+
+TABELA_MANIFESTO = "manifesto_ingestao"  # Arquivos já ingeridos por copiar_dados_treinamento
+COLUNA_ORIGEM = "arquivo_origem"  # Arquivo de cada linha, com copiar_dados_treinamento(rastrear_origem=True)
+
+# Caracteres que o formato texto do COPY do PostgreSQL exige escapar
+_ESCAPES_COPY = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _linha_copy(linha):
+    # Uma linha do COPY ... FROM STDIN em formato texto: colunas separadas por tab e NULL como \N
+    return "\t".join("\\N" if valor is None else str(valor).translate(_ESCAPES_COPY) for valor in linha) + "\n"
+
+
+def __getattr__(nome):
+    # Mantém `DatabaseManager.fake` disponível, mas só cria o Faker no primeiro acesso
+    global _fake
+    if nome == "fake":
+        if _fake is None:
+            from faker import Faker
+            _fake = Faker()
+        return _fake
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+
+
+class MontadorArrays:
+    # Preenche lote a lote os arrays finais de carregar_arrays; usado pelo DatabaseManager e
+    # pela leitura assíncrona nativa do DatabaseManagerAsync
+    def __init__(self, nome_tabela, tipos, colunas_features, coluna_label, dtype_features=None, db_type=None):
+        import numpy as np
+
+        self.nome_tabela = nome_tabela
+        self.num_features = len(colunas_features)
+        if dtype_features is None:
+            dtypes = {coluna: DatabaseManager._dtype_numpy(tipos.get(coluna, ""), db_type) for coluna in colunas_features}
+            nao_numericas = [f"{coluna} ({tipos.get(coluna)})" for coluna, dtype in dtypes.items() if dtype.kind == 'O']
+            if nao_numericas:
+                raise ValueError(f"Colunas de features não numéricas em {nome_tabela}: {', '.join(nao_numericas)}")
+            dtype_features = np.result_type(*dtypes.values())
+        self.dtype_features = dtype_features
+        # Labels de texto (ex.: nomes de classes) ficam num array de objetos separado das features
+        self.dtype_labels = DatabaseManager._dtype_numpy(tipos.get(coluna_label, ""), db_type)
+        self.colunas = ', '.join(list(colunas_features) + [coluna_label])
+        self.posicao = 0
+
+    def query_contagem(self, where=None):
+        query = f"SELECT COUNT(*) FROM {self.nome_tabela}"
+        return query + f" WHERE {where}" if where else query
+
+    def alocar(self, total):
+        import numpy as np
+
+        self.total = total
+        self.features = np.empty((total, self.num_features), dtype=self.dtype_features)
+        self.labels = np.empty(total, dtype=self.dtype_labels)
+
+    def adicionar(self, linhas):
+        # Só o lote atual passa por objetos Python; devolve True quando os buffers se completam
+        import numpy as np
+
+        fim = min(self.posicao + len(linhas), self.total)
+        linhas = linhas[:fim - self.posicao]
+        num_features = self.num_features
+        try:
+            if self.dtype_labels.kind == 'O':
+                self.features[self.posicao:fim] = [linha[:num_features] for linha in linhas]
+                self.labels[self.posicao:fim] = [linha[num_features] for linha in linhas]
+            else:
+                lote = np.array(linhas, dtype=np.result_type(self.dtype_features, self.dtype_labels))
+                self.features[self.posicao:fim] = lote[:, :num_features]
+                self.labels[self.posicao:fim] = lote[:, num_features]
+        except (TypeError, ValueError) as e:
+            # Ex.: texto numa coluna sem tipo declarado no SQLite
+            raise ValueError(f"Valores não numéricos ao carregar {self.colunas} de {self.nome_tabela}: {e}") from e
+        self.posicao = fim
+        return self.posicao == self.total
+
+    def resultado(self):
+        return {"features": self.features[:self.posicao], "labels": self.labels[:self.posicao]}
 
-fake = Faker()
 
 class DatabaseManager:
     def __init__(self, db_type, **kwargs):
         self.db_type = db_type
-        self.connection = None
-        self.connection_pool = None  # Para MySQL e PostgreSQL
+        self.connection_pool = None  # Criado no primeiro uso por _get_connection
         self.db_path = kwargs.get("db_path")  # Para SQLite
 
         if db_type in ("mysql", "postgresql"):
             self.host = kwargs.get("host")
+            self.port = kwargs.get("port")
             self.user = kwargs.get("user")
             self.password = kwargs.get("password")
             self.database = kwargs.get("database")
             self.pool_size = kwargs.get("pool_size", 3)
+        else:
+            # Cada conexão a ":memory:" é um banco diferente, então o pool precisa de uma só
+            self.pool_size = 1 if self._em_memoria() else kwargs.get("pool_size", 3)
 
-    def _get_connection(self):
+        self.pool_timeout = kwargs.get("pool_timeout", 30.0)  # Espera máxima por uma conexão livre
+        self.pool_max_ocioso = kwargs.get("pool_max_ocioso", 300.0)  # Recicla conexões ociosas há mais tempo
+        self.pool_verificar_apos = kwargs.get("pool_verificar_apos", 30.0)  # Verifica conexões ociosas há mais tempo
+        self.tamanho_lote = kwargs.get("tamanho_lote", 1000)  # Linhas por transação/lote de leitura
+        self.cache_instrucoes = CacheInstrucoes(kwargs.get("tamanho_cache_instrucoes", 128))
+        # Cache opcional dos resultados de carregar_dados/carregar_arrays (desligado por padrão)
+        self.cache_resultados = None
+        if kwargs.get("cache_resultados", False):
+            self.cache_resultados = CacheResultados(
+                kwargs.get("cache_tamanho_maximo", 256 * 1024 * 1024), kwargs.get("cache_ttl", 300.0),
+                kwargs.get("diretorio_cache"), kwargs.get("cache_tamanho_maximo_disco"), self._identidade_banco(),
+            )
+        # Com True, a contagem de linhas entra na chave e detecta escritas feitas por outros processos
+        self.cache_verificar_contagem = kwargs.get("cache_verificar_contagem", True)
+        self._versoes_tabelas = {}
+        self._contador_cursores = itertools.count(1)
+        self._lock_pool = threading.Lock()
+        self._origem_conexoes = {}  # id(conexão em uso) -> pool de onde ela saiu
+
+    def _criar_conexao(self):
         if self.db_type == "sqlite":
-            return self.connection
+            # O pool garante que cada conexão é usada por uma thread de cada vez
+            return sqlite3.connect(self.db_path or ":memory:", check_same_thread=False,
+                                   cached_statements=self.cache_instrucoes.tamanho_maximo)
         elif self.db_type == "mysql":
-            return self.connection_pool.get_connection()
+            import mysql.connector
+
+            return mysql.connector.connect(host=self.host, port=self.port or 3306, user=self.user,
+                                           password=self.password, database=self.database)
         elif self.db_type == "postgresql":
-            return self.connection_pool.getconn()
+            import psycopg2
+
+            return psycopg2.connect(host=self.host, port=self.port or 5432, user=self.user,
+                                    password=self.password, dbname=self.database)
+        raise ValueError(f"Tipo de banco de dados não suportado: {self.db_type}")
+
+    def _verificar_conexao(self, conn):
+        if self.db_type == "mysql":
+            conn.ping(reconnect=False)
+            return
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+        finally:
+            cursor.close()
+        if self.db_type == "postgresql":
+            conn.rollback()  # O SELECT abriu uma transação
+
+    def _identidade_banco(self):
+        # De qual banco vêm os resultados em cache; um ":memory:" só existe neste objeto
+        if self.db_type == "sqlite":
+            if self._em_memoria():
+                return ("sqlite", ":memory:", os.getpid(), id(self))
+            return ("sqlite", os.path.abspath(self.db_path))
+        return (self.db_type, self.host, self.port, self.database)
+
+    def _em_memoria(self):
+        return self.db_type == "sqlite" and self.db_path in (None, ":memory:")
+
+    def _obter_pool(self):
+        if self.connection_pool is None:
+            with self._lock_pool:
+                if self.connection_pool is None:
+                    # Fechar a única conexão de um banco ":memory:" apaga o banco: sem reciclagem
+                    # por ociosidade nem troca após a verificação
+                    em_memoria = self._em_memoria()
+                    self.connection_pool = PoolConexoes(
+                        self._criar_conexao, self.pool_size, None if em_memoria else self._verificar_conexao,
+                        max_ocioso=None if em_memoria else self.pool_max_ocioso,
+                        verificar_apos=self.pool_verificar_apos, timeout=self.pool_timeout,
+                    )
+        return self.connection_pool
+
+    def _get_connection(self):
+        pool = self._obter_pool()
+        conn = pool.obter()
+        self._origem_conexoes[id(conn)] = pool
+        return conn
+
+    def _liberar_conexao(self, conn, descartar=False):
+        # Devolve ao pool de onde a conexão saiu: se close() rodou enquanto ela estava em uso,
+        # o pool antigo (já fechado) a fecha, em vez de um pool novo receber uma conexão que
+        # ele nunca contou
+        self._origem_conexoes.pop(id(conn)).devolver(conn, descartar)
+
+    def _reverter(self, conn, erro=None):
+        # Desfaz a transação após um erro e diz se a conexão ainda pode voltar ao pool: não
+        # pode se o rollback falhar ou se o driver indicar conexão perdida. No SQLite
+        # OperationalError também cobre erros de SQL (ex.: tabela inexistente), e descartar a
+        # única conexão de um banco ":memory:" apagaria o banco, então só o rollback conta.
+        try:
+            conn.rollback()
+        except Exception:
+            return False
+        if erro is None or self.db_type == "sqlite":
+            return True
+        return not any(classe.__name__ in ("OperationalError", "InterfaceError") for classe in type(erro).__mro__)
+
+    def conexao(self):
+        # Context manager: `with db_manager.conexao() as conn:` devolve a conexão ao pool no final
+        return self._obter_pool().conexao()
+
+    def metricas_pool(self):
+        # Checkouts, conexões criadas/recicladas/descartadas e tempo de espera por conexão livre
+        return self._obter_pool().metricas()
 
     def close(self):
-        if self.connection:
-            self.connection.close()
-        elif self.connection_pool:
-            self.connection_pool.closeall()
+        with self._lock_pool:
+            if self.connection_pool:
+                self.connection_pool.fechar_todas()
+                self.connection_pool = None
+
+    def _parametros(self, params):
+        # psycopg2 interpola `%` sempre que params não é None, mesmo vazio, e quebraria um
+        # LIKE '%x%' escrito direto no SQL; o sqlite3 exige uma sequência
+        if params:
+            return params
+        return () if self.db_type == "sqlite" else None
 
     def _execute_query(self, query, params=None):
         conn = self._get_connection()
+        descartar = False
         cursor = conn.cursor()
         try:
-            cursor.execute(query, params)
-            conn.commit()
-            return cursor.fetchall()  # Use fetchall para todas as consultas
+            with instrumentacao.medir("db.consulta"):
+                cursor.execute(query, self._parametros(params))
+                # INSERT/CREATE não têm resultado, e fetchall levanta erro no MySQL/PostgreSQL
+                resultado = cursor.fetchall() if cursor.description is not None else []
+                conn.commit()
+            instrumentacao.contar("db.linhas_lidas", len(resultado))
+            return resultado
         except Exception as e:
             print(f"Erro ao executar query: {e}")
-            conn.rollback()
+            descartar = not self._reverter(conn, e)
             raise
         finally:
-            cursor.close()
-            if self.db_type in ("mysql", "postgresql"):
-                conn.close()
+            try:
+                cursor.close()
+            finally:
+                self._liberar_conexao(conn, descartar)
+
+    def carregar_dados(self, nome_tabela, colunas="*", where=None, filtros=None):
+        # filtros: {coluna: valor} combinados com AND e enviados como parâmetros, de modo que
+        # chamadas que só mudam os valores reaproveitam a mesma instrução preparada
+        query, params = self._montar_select(nome_tabela, colunas, where, filtros)
+        # Só consultas cujos %s vieram todos de _montar_select são preparadas: num `where` escrito
+        # à mão, um LIKE '%silva%' seria numerado como parâmetro no PREPARE
+        executar = self._execute_query if where else self._executar_instrucao
+        if self.cache_resultados is None:
+            return executar(query, params)
+        chave = CacheResultados.chave("linhas", query, params, self._impressao_tabela(nome_tabela))
+        return self.cache_resultados.obter(nome_tabela, chave, lambda: executar(query, params))
+
+    def _impressao_tabela(self, nome_tabela):
+        # Versão local (incrementada a cada escrita por este DatabaseManager) e, opcionalmente,
+        # o número de linhas, que muda quando outro processo escreve na tabela
+        versao = self._versoes_tabelas.get(nome_tabela, 0)
+        if not self.cache_verificar_contagem:
+            return versao, None
+        return versao, self._execute_query(f"SELECT COUNT(*) FROM {nome_tabela}")[0][0]
+
+    def invalidar_cache(self, nome_tabela=None):
+        if nome_tabela is None:
+            self._versoes_tabelas.clear()
+        else:
+            self._versoes_tabelas[nome_tabela] = self._versoes_tabelas.get(nome_tabela, 0) + 1
+        if self.cache_resultados is not None:
+            self.cache_resultados.invalidar(nome_tabela)
+
+    def carregar_dados_em_lotes(self, nome_tabela, colunas="*", where=None, tamanho_lote=None, filtros=None):
+        # Versão em streaming de carregar_dados: gera listas de até tamanho_lote linhas
+        query, params = self._montar_select(nome_tabela, colunas, where, filtros)
+        return self._iterar_query(query, params, tamanho_lote=tamanho_lote or self.tamanho_lote)
+
+    def _montar_select(self, nome_tabela, colunas="*", where=None, filtros=None):
+        colunas_filtro = tuple(sorted(filtros)) if filtros else ()
+        chave = ("select", nome_tabela, colunas, where, colunas_filtro)
+
+        def montar():
+            query = f"SELECT {colunas} FROM {nome_tabela}"
+            condicoes = [f"({where})" if colunas_filtro else where] if where else []
+            condicoes += [f"{coluna} = {self._placeholder()}" for coluna in colunas_filtro]
+            if condicoes:
+                query += " WHERE " + " AND ".join(condicoes)
+            return query
+
+        query = self.cache_instrucoes.obter(chave, montar)
+        return query, tuple(filtros[coluna] for coluna in colunas_filtro)
+
+    def _executar_instrucao(self, query, params=()):
+        # Como _execute_query, mas usando instruções preparadas no servidor (PostgreSQL/MySQL)
+        if self.db_type == "sqlite":
+            return self._execute_query(query, params)
+        conn = self._get_connection()
+        cursor = None
+        descartar = False
+        try:
+            with instrumentacao.medir("db.consulta"):
+                if self.db_type == "postgresql":
+                    cursor = conn.cursor()
+                    try:
+                        cursor.execute(self.cache_instrucoes.preparar_postgresql(conn, cursor, query, len(params)), params)
+                    except Exception as e:
+                        if "cached plan must not change result type" not in str(e):
+                            raise
+                        # A tabela mudou depois do PREPARE (ex.: ADD COLUMN num SELECT *): prepara de novo
+                        conn.rollback()
+                        self.cache_instrucoes.descartar_postgresql(conn, cursor, query)
+                        cursor.execute(self.cache_instrucoes.preparar_postgresql(conn, cursor, query, len(params)), params)
+                else:
+                    cursor = self.cache_instrucoes.cursor_mysql(conn, query)
+                    cursor.execute(query, params)
+                resultado = cursor.fetchall() if cursor.description is not None else []
+                conn.commit()
+            instrumentacao.contar("db.linhas_lidas", len(resultado))
+            return resultado
+        except Exception as e:
+            print(f"Erro ao executar query: {e}")
+            descartar = not self._reverter(conn, e)
+            self.cache_instrucoes.esquecer(conn)
+            raise
+        finally:
+            try:
+                # Cursores preparados do MySQL ficam no cache junto com a conexão
+                if cursor is not None and self.db_type == "postgresql":
+                    cursor.close()
+            finally:
+                self._liberar_conexao(conn, descartar)
+
+    def _abrir_cursor_streaming(self, conn, tamanho_lote):
+        if self.db_type == "postgresql":
+            # Cursor nomeado: o resultado fica no servidor e é buscado em blocos
+            cursor = conn.cursor(name=f"aicluster_cursor_{os.getpid()}_{next(self._contador_cursores)}")
+            cursor.itersize = tamanho_lote
+            return cursor
+        elif self.db_type == "mysql":
+            # Cursor sem buffer: as linhas são lidas do socket conforme o fetchmany
+            return conn.cursor(buffered=False)
+        return conn.cursor()
+
+    def _iterar_query(self, query, params=None, tamanho_lote=1000):
+        conn = self._get_connection()
+        try:
+            cursor = self._abrir_cursor_streaming(conn, tamanho_lote)
+        except Exception:
+            self._liberar_conexao(conn, not self._reverter(conn))
+            raise
+        erro = None
+        try:
+            with instrumentacao.medir("db.consulta"):
+                cursor.execute(query, self._parametros(params))
+            while True:
+                # Só o fetch é medido; o tempo em que o consumidor processa o lote fica de fora
+                with instrumentacao.medir("db.fetch"):
+                    linhas = cursor.fetchmany(tamanho_lote)
+                if not linhas:
+                    break
+                instrumentacao.contar("db.linhas_lidas", len(linhas))
+                yield linhas
+        except Exception as e:
+            print(f"Erro ao executar query: {e}")
+            erro = e
+            raise
+        finally:
+            try:
+                if self.db_type == "mysql":
+                    # Descarta o restante do resultado se o consumidor parou antes do fim
+                    conn.consume_results()
+                cursor.close()
+                # Encerra a transação de leitura (e o cursor nomeado) antes de devolver ao pool
+                reutilizavel = self._reverter(conn, erro) if erro is not None or self.db_type != "sqlite" else True
+            except Exception:
+                reutilizavel = False
+            self._liberar_conexao(conn, not reutilizavel)
+
+    def carregar_arrays(self, nome_tabela, colunas_features, coluna_label, where=None, tamanho_lote=None, dtype_features=None):
+        # Carrega direto em arrays NumPy contíguos no formato {"features", "labels"} usado pelo TreinadorIA
+        if self.cache_resultados is None:
+            with instrumentacao.medir("db.carregar_arrays"):
+                return self._carregar_arrays(nome_tabela, colunas_features, coluna_label, where, tamanho_lote, dtype_features)
+        chave = CacheResultados.chave("arrays", nome_tabela, tuple(colunas_features), coluna_label, where,
+                                      str(dtype_features), self._impressao_tabela(nome_tabela))
+        with instrumentacao.medir("db.carregar_arrays"):
+            return self.cache_resultados.obter(nome_tabela, chave, lambda: self._carregar_arrays(
+                nome_tabela, colunas_features, coluna_label, where, tamanho_lote, dtype_features))
 
-    def carregar_dados(self, nome_tabela, colunas="*", where=None):
-        query = f"SELECT {colunas} FROM {nome_tabela}"
-        if where:
-            query += f" WHERE {where}"
-        return self._execute_query(query)
+    def _carregar_arrays(self, nome_tabela, colunas_features, coluna_label, where=None, tamanho_lote=None, dtype_features=None):
+        montador = MontadorArrays(nome_tabela, self._tipos_colunas(nome_tabela), colunas_features, coluna_label,
+                                  dtype_features, self.db_type)
+        # A tabela pode perder linhas entre o COUNT e a leitura
+        montador.alocar(self._execute_query(montador.query_contagem(where))[0][0])
+        for linhas in self.carregar_dados_em_lotes(nome_tabela, montador.colunas, where, tamanho_lote):
+            if montador.adicionar(linhas):
+                break
+        return montador.resultado()
+
+    def _query_tipos_colunas(self, nome_tabela):
+        if self.db_type == "sqlite":
+            return f"PRAGMA table_info({nome_tabela})", None
+        return "SELECT column_name, data_type FROM information_schema.columns WHERE table_name = %s", (nome_tabela,)
+
+    def _tipos_colunas(self, nome_tabela):
+        query, params = self._query_tipos_colunas(nome_tabela)
+        return self._ler_tipos_colunas(self._execute_query(query, params))
+
+    def _ler_tipos_colunas(self, linhas):
+        if self.db_type == "sqlite":
+            return {linha[1]: (linha[2] or "").lower() for linha in linhas}
+        return {linha[0]: linha[1].lower() for linha in linhas}
+
+    @staticmethod
+    def _dtype_numpy(tipo_sql, db_type=None):
+        import numpy as np
+
+        if any(texto in tipo_sql for texto in ("char", "text", "clob", "json", "uuid", "enum", "date", "time")):
+            return np.dtype(object)
+        if "bool" in tipo_sql:
+            return np.dtype(np.bool_)
+        if "int" in tipo_sql:
+            return np.dtype(np.int64)
+        # REAL só tem 4 bytes no PostgreSQL (no SQLite é um double de 8 bytes, e no MySQL é
+        # DOUBLE por padrão); FLOAT só tem 4 bytes no MySQL
+        if tipo_sql == "float4" or (tipo_sql == "real" and db_type == "postgresql") or (tipo_sql == "float" and db_type == "mysql"):
+            return np.dtype(np.float32)
+        # double, numeric, decimal e colunas sem tipo declarado
+        return np.dtype(np.float64)
 
     def descartar_banco_temporario(self):
         if self.db_type == "sqlite":
@@ -90,6 +467,8 @@ class DatabaseManager:
                 )
             ''')
         elif self.db_type == "mysql":
+            import mysql.connector
+
             temp_connection = mysql.connector.connect(host=self.host, user=self.user, password=self.password)
             try:
                 cursor = temp_connection.cursor()
@@ -102,49 +481,274 @@ class DatabaseManager:
         elif self.db_type == "postgresql":
             self._execute_query(f"CREATE DATABASE IF NOT EXISTS {self.database}")
 
-    def salvar_dados(self, dados, nome_tabela):
+    def salvar_dados(self, dados, nome_tabela, tamanho_lote=None, usar_copy=False):
+        # Agrupa as linhas pela assinatura de colunas e grava em lotes, uma transação por lote
+        tamanho_lote = tamanho_lote or self.tamanho_lote
+        total = 0
+        inicio = time.perf_counter()
         try:
-            if self.db_type == "sqlite":
-                for item in dados:
-                    cursor = self.connection.cursor()
-                    colunas = ', '.join(item.keys())
-                    placeholders = ', '.join(['?'] * len(item))
-                    valores = tuple(item.values())
-                    sql = f"INSERT INTO {nome_tabela} ({colunas}) VALUES ({placeholders})"
-                    cursor.execute(sql, valores)
-                self.connection.commit()
-            elif self.db_type in ("mysql", "postgresql"):
-                for item in dados:
-                    colunas = ', '.join(item.keys())
-                    placeholders = ', '.join(['%s'] * len(item))
-                    valores = tuple(item.values())
-                    sql = f"INSERT INTO {nome_tabela} ({colunas}) VALUES ({placeholders})"
-                    self._execute_query(sql, valores)
+            for colunas, linhas in self._agrupar_em_lotes(dados, tamanho_lote):
+                self._inserir_lote(nome_tabela, colunas, linhas, usar_copy)
+                total += len(linhas)
         except Exception as e:
             print(f"Erro ao salvar dados: {e}")
+        if total:
+            self.invalidar_cache(nome_tabela)
+        duracao = time.perf_counter() - inicio
+        linhas_por_segundo = total / duracao if duracao > 0 else 0.0
+        print(f"{total} linhas salvas em {nome_tabela} ({linhas_por_segundo:.0f} linhas/s)")
+        return {"linhas": total, "segundos": duracao, "linhas_por_segundo": linhas_por_segundo}
 
-    def copiar_dados_treinamento(self, nome_banco, caminho_banco, diretorio_dados):
-        dados = []
-        for filename in os.listdir(diretorio_dados):
-            filepath = os.path.join(diretorio_dados, filename)
+    def _agrupar_em_lotes(self, dados, tamanho_lote):
+        # Aceita qualquer iterável de dicts; só mantém em memória um lote por assinatura de colunas
+        pendentes = {}
+        for item in dados:
+            colunas = tuple(sorted(item.keys()))
+            linhas = pendentes.setdefault(colunas, [])
+            linhas.append(tuple(item[coluna] for coluna in colunas))
+            if len(linhas) >= tamanho_lote:
+                yield colunas, pendentes.pop(colunas)
+        for colunas, linhas in pendentes.items():
+            yield colunas, linhas
+
+    def _inserir_lote(self, nome_tabela, colunas, linhas, usar_copy=False):
+        conn = self._get_connection()
+        descartar = False
+        cursor = conn.cursor()
+        try:
+            self._executar_insercao(cursor, nome_tabela, colunas, linhas, usar_copy)
+            with instrumentacao.medir("db.commit"):
+                conn.commit()
+        except Exception as e:
+            descartar = not self._reverter(conn, e)
+            raise
+        finally:
             try:
-                if filename.endswith(".json"):
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        dados.extend(json.load(f))
-                elif filename.endswith(".csv"):
-                    with open(filepath, 'r', encoding='utf-8', newline='') as f:
-                        reader = csv.DictReader(f)
-                        dados.extend(list(reader))
-                elif filename.endswith((".yaml", ".yml")):
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        dados.extend(yaml.safe_load(f))
-                else:
-                    dados.append({"filepath": filepath, "filetype": filename.split('.')[-1]})
-            except Exception as e:
-                print(f"Erro ao carregar o arquivo {filename}: {e}")
+                cursor.close()
+            finally:
+                self._liberar_conexao(conn, descartar)
+
+    def _executar_insercao(self, cursor, nome_tabela, colunas, linhas, usar_copy=False):
+        sql = self.cache_instrucoes.obter(("insert", nome_tabela, colunas, usar_copy),
+                                          lambda: self._montar_insert(nome_tabela, colunas, usar_copy))
+        with instrumentacao.medir("db.insercao"):
+            if self.db_type in ("sqlite", "mysql"):
+                # sqlite3: uma única transação implícita e a instrução reaproveitada do cache da conexão;
+                # mysql.connector: o executemany de INSERT vira um único VALUES multi-linha
+                cursor.executemany(sql, linhas)
+            elif usar_copy:
+                # Formato texto do COPY: None vira \N e strings vazias continuam strings vazias
+                # (no formato csv os dois chegariam como NULL)
+                buffer = io.StringIO()
+                buffer.writelines(_linha_copy(linha) for linha in linhas)
+                buffer.seek(0)
+                cursor.copy_expert(sql, buffer)
+            else:
+                from psycopg2.extras import execute_values
+
+                execute_values(cursor, sql, linhas, page_size=len(linhas))
+        instrumentacao.contar("db.linhas_inseridas", len(linhas))
+
+    def _montar_insert(self, nome_tabela, colunas, usar_copy=False):
+        lista_colunas = ', '.join(colunas)
+        if self.db_type == "postgresql":
+            if usar_copy:
+                return f"COPY {nome_tabela} ({lista_colunas}) FROM STDIN"
+            return f"INSERT INTO {nome_tabela} ({lista_colunas}) VALUES %s"
+        placeholders = ', '.join([self._placeholder()] * len(colunas))
+        return f"INSERT INTO {nome_tabela} ({lista_colunas}) VALUES ({placeholders})"
+
+    def _placeholder(self):
+        return '?' if self.db_type == "sqlite" else '%s'
+
+    def copiar_dados_treinamento(self, nome_banco, caminho_banco, diretorio_dados, num_processos=None, tamanho_lote=None,
+                                 incremental=True, rastrear_origem=False):
+        # Os arquivos são lidos em paralelo por processos leitores e as linhas chegam em lotes
+        # por uma fila limitada, sendo gravadas à medida que chegam.
+        # rastrear_origem=True acrescenta a coluna arquivo_origem (com índice) a dados_treinamento,
+        # para que as linhas de um arquivo reescrito sejam trocadas e não duplicadas. Sem ela a
+        # tabela não muda de esquema, e um arquivo reescrito é ingerido de novo com um aviso.
+        from DataExpansion.ingestao import iterar_linhas_diretorio
+
+        tamanho_lote = tamanho_lote or self.tamanho_lote
+        arquivos = [os.path.join(diretorio_dados, filename) for filename in sorted(os.listdir(diretorio_dados))]
+        arquivos = [filepath for filepath in arquivos if os.path.isfile(filepath)]
+        if not arquivos:
+            return None
+        try:
+            if incremental:
+                return self._copiar_incremental(arquivos, num_processos, tamanho_lote, rastrear_origem)
+            linhas = iterar_linhas_diretorio(arquivos, num_processos, tamanho_lote)
+            return self.salvar_dados(linhas, "dados_treinamento", tamanho_lote)
+        except Exception as e:
+            print(f"Erro ao salvar dados no banco de dados: {e}")
+
+    def _criar_manifesto(self):
+        self._execute_query(f"""
+            CREATE TABLE IF NOT EXISTS {TABELA_MANIFESTO} (
+                caminho VARCHAR(512) PRIMARY KEY,
+                tamanho BIGINT,
+                mtime DOUBLE PRECISION,
+                hash_conteudo VARCHAR(64),
+                linhas BIGINT,
+                concluido INTEGER
+            )
+        """)
+
+    def _carregar_manifesto(self):
+        linhas = self._execute_query(f"SELECT caminho, tamanho, mtime, hash_conteudo, linhas, concluido FROM {TABELA_MANIFESTO}")
+        return {linha[0]: linha[1:] for linha in linhas}
+
+    def _registrar_no_manifesto(self, filepath, tamanho, mtime, hash_conteudo, linhas, concluido, apagar_linhas=False):
+        # Com apagar_linhas, as linhas já ingeridas do arquivo saem na mesma transação
+        # que reinicia o seu registro no manifesto
+        p = self._placeholder()
+        instrucoes = []
+        if apagar_linhas:
+            instrucoes.append((f"DELETE FROM dados_treinamento WHERE {COLUNA_ORIGEM} = {p}", (filepath,)))
+        instrucoes.append((f"DELETE FROM {TABELA_MANIFESTO} WHERE caminho = {p}", (filepath,)))
+        instrucoes.append((f"INSERT INTO {TABELA_MANIFESTO} (caminho, tamanho, mtime, hash_conteudo, linhas, concluido) "
+                           f"VALUES ({p}, {p}, {p}, {p}, {p}, {p})", (filepath, tamanho, mtime, hash_conteudo, linhas, concluido)))
+        self._executar_transacao(instrucoes)
 
-        if dados:
+    def _executar_transacao(self, instrucoes):
+        conn = self._get_connection()
+        descartar = False
+        cursor = conn.cursor()
+        try:
+            for query, params in instrucoes:
+                cursor.execute(query, params)
+            conn.commit()
+        except Exception as e:
+            print(f"Erro ao executar query: {e}")
+            descartar = not self._reverter(conn, e)
+            raise
+        finally:
             try:
-                self.salvar_dados(dados, "dados_treinamento")
-            except Exception as e:
-                print(f"Erro ao salvar dados no banco de dados: {e}")
+                cursor.close()
+            finally:
+                self._liberar_conexao(conn, descartar)
+
+    def _coluna_origem(self, nome_tabela, criar=False):
+        # Diz se cada linha ingerida guarda o caminho do seu arquivo, para que as linhas antigas
+        # de um arquivo reescrito sejam apagadas antes de ele ser ingerido de novo. A coluna só é
+        # criada com criar=True; se já existir (de uma ingestão anterior), continua sendo usada.
+        if COLUNA_ORIGEM in {coluna.lower() for coluna in self._tipos_colunas(nome_tabela)}:
+            return True
+        if not criar:
+            return False
+        self._execute_query(f"ALTER TABLE {nome_tabela} ADD COLUMN {COLUNA_ORIGEM} VARCHAR(512)")
+        self._execute_query(f"CREATE INDEX idx_{nome_tabela}_{COLUNA_ORIGEM} ON {nome_tabela} ({COLUNA_ORIGEM})")
+        return True
+
+    @staticmethod
+    def _hash_arquivo(filepath, tamanho_bloco=1 << 20, limite=None):
+        # limite: considera só os primeiros `limite` bytes
+        hash_conteudo = hashlib.sha256()
+        restante = float("inf") if limite is None else limite
+        with open(filepath, 'rb') as f:
+            while restante > 0:
+                bloco = f.read(int(min(tamanho_bloco, restante)))
+                if not bloco:
+                    break
+                hash_conteudo.update(bloco)
+                restante -= len(bloco)
+        return hash_conteudo.hexdigest()
+
+    def _apenas_anexado(self, filepath, registro):
+        # Arquivo de linhas (JSONL/CSV) que só ganhou conteúdo no fim: o trecho antigo tem o
+        # mesmo hash e terminava numa quebra de linha, então as linhas já gravadas não mudaram
+        tamanho_anterior = registro[0]
+        if not filepath.endswith((".jsonl", ".ndjson", ".csv")) or not tamanho_anterior:
+            return False
+        if os.path.getsize(filepath) <= tamanho_anterior:
+            return False
+        with open(filepath, 'rb') as f:
+            f.seek(tamanho_anterior - 1)
+            if f.read(1) != b"\n":
+                return False
+        return self._hash_arquivo(filepath, limite=tamanho_anterior) == registro[2]
+
+    def _planejar_ingestao(self, arquivos, rastrear_origem=False):
+        # Decide, arquivo a arquivo, se pula, retoma do checkpoint ou começa do zero
+        manifesto = self._carregar_manifesto()
+        pendentes = []
+        for filepath in arquivos:
+            estado = os.stat(filepath)
+            registro = manifesto.get(filepath)
+            if registro and registro[0] == estado.st_size and registro[1] == estado.st_mtime and registro[4]:
+                continue  # Tamanho e mtime iguais: nem precisa calcular o hash
+            hash_conteudo = self._hash_arquivo(filepath)
+            apagar_linhas = False
+            if registro and registro[2] == hash_conteudo:
+                if registro[4]:
+                    # Só o mtime mudou (ex.: cópia ou touch); o conteúdo já foi ingerido
+                    self._registrar_no_manifesto(filepath, estado.st_size, estado.st_mtime, hash_conteudo, registro[3], 1)
+                    continue
+                pular = registro[3] or 0
+            elif registro and registro[3] and self._apenas_anexado(filepath, registro):
+                # Linhas novas no fim do arquivo: continua depois das que já foram gravadas
+                pular = registro[3]
+            else:
+                # Arquivo novo ou reescrito: as linhas gravadas da versão anterior são apagadas
+                pular = 0
+                apagar_linhas = bool(registro and registro[3]) and rastrear_origem
+                if registro and registro[3] and not rastrear_origem:
+                    print(f"Aviso: {os.path.basename(filepath)} foi reescrito e será ingerido de novo; as {registro[3]} "
+                          f"linha(s) da versão anterior continuam em dados_treinamento (use rastrear_origem=True)")
+            self._registrar_no_manifesto(filepath, estado.st_size, estado.st_mtime, hash_conteudo, pular, 0, apagar_linhas)
+            pendentes.append((filepath, pular))
+        return pendentes
+
+    def _copiar_incremental(self, arquivos, num_processos, tamanho_lote, rastrear_origem=False):
+        from DataExpansion.ingestao import iterar_lotes_diretorio
+
+        self._criar_manifesto()
+        rastrear_origem = self._coluna_origem("dados_treinamento", criar=rastrear_origem)
+        # Caminhos absolutos, para que o manifesto não dependa do diretório de trabalho
+        pendentes = self._planejar_ingestao([os.path.abspath(filepath) for filepath in arquivos], rastrear_origem)
+        print(f"{len(arquivos) - len(pendentes)} arquivo(s) sem alterações ignorado(s), {len(pendentes)} para ingerir")
+        progresso = dict(pendentes)
+        total = 0
+        inicio = time.perf_counter()
+        p = self._placeholder()
+        try:
+            for tipo, filepath, conteudo in iterar_lotes_diretorio(pendentes, num_processos, tamanho_lote):
+                if tipo == "lote":
+                    if rastrear_origem:
+                        for item in conteudo:
+                            item[COLUNA_ORIGEM] = filepath
+                    progresso[filepath] += len(conteudo)
+                    self._gravar_lote_com_checkpoint("dados_treinamento", conteudo, filepath, progresso[filepath])
+                    total += len(conteudo)
+                elif tipo == "arquivo":
+                    self._execute_query(f"UPDATE {TABELA_MANIFESTO} SET concluido = 1 WHERE caminho = {p}", (filepath,))
+        finally:
+            if pendentes:  # Linhas gravadas ou apagadas de arquivos reescritos
+                self.invalidar_cache("dados_treinamento")
+        duracao = time.perf_counter() - inicio
+        linhas_por_segundo = total / duracao if duracao > 0 else 0.0
+        print(f"{total} linhas salvas em dados_treinamento ({linhas_por_segundo:.0f} linhas/s)")
+        return {"linhas": total, "segundos": duracao, "linhas_por_segundo": linhas_por_segundo}
+
+    def _gravar_lote_com_checkpoint(self, nome_tabela, itens, filepath, linhas_gravadas):
+        # As linhas e o novo checkpoint do arquivo são confirmados na mesma transação, então
+        # uma ingestão interrompida retoma exatamente depois do último lote gravado
+        conn = self._get_connection()
+        descartar = False
+        cursor = conn.cursor()
+        p = self._placeholder()
+        try:
+            for colunas, linhas in self._agrupar_em_lotes(itens, len(itens)):
+                self._executar_insercao(cursor, nome_tabela, colunas, linhas)
+            cursor.execute(f"UPDATE {TABELA_MANIFESTO} SET linhas = {p} WHERE caminho = {p}", (linhas_gravadas, filepath))
+            with instrumentacao.medir("db.commit"):
+                conn.commit()
+        except Exception as e:
+            descartar = not self._reverter(conn, e)
+            raise
+        finally:
+            try:
+                cursor.close()
+            finally:
+                self._liberar_conexao(conn, descartar)
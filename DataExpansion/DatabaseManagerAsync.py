@@ -0,0 +1,245 @@
+import functools
+import time
+
+from DataExpansion.DatabaseManager import DatabaseManager, MontadorArrays
+from DataExpansion.instrumentacao import instrumentacao
+from DataExpansion.pool_conexoes import PoolConexoesAsync
+
+# asyncio e concurrent.futures (~60 ms) são importados só quando um DatabaseManagerAsync é
+# usado, já que o pacote importa esta classe junto com o DatabaseManager
+
+
+class DatabaseManagerAsync:
+    # Contraparte asyncio do DatabaseManager.
+    #  - MySQL: API async nativa do mysql.connector.aio, com um PoolConexoesAsync próprio;
+    #    enquanto uma consulta espera o servidor, o event loop fica livre, sem threads.
+    #  - SQLite e PostgreSQL: o sqlite3 não tem API async, e o modo assíncrono do psycopg2 só
+    #    funciona com um loop próprio de poll em cima do socket, sem executemany/COPY/cursores
+    #    nomeados, que o DatabaseManager usa. Para eles (e para o MySQL com async_nativo=False)
+    #    cada operação roda num executor com uma thread por conexão do pool síncrono.
+    # Com cache_resultados ligado, carregar_dados/carregar_arrays também passam pelo executor,
+    # porque o cache (memória e disco) é compartilhado com o DatabaseManager síncrono.
+    #
+    #     async with DatabaseManagerAsync("sqlite", db_path="dados.db") as db:
+    #         linhas, _ = await asyncio.gather(db.carregar_dados("t"), db.salvar_dados(novos, "t"))
+    def __init__(self, db_type=None, db_manager=None, async_nativo=True, **kwargs):
+        self.db_manager = db_manager or DatabaseManager(db_type, **kwargs)
+        self.nativo = async_nativo and self.db_manager.db_type == "mysql"
+        self._executor = None
+        self._pool = None
+
+    async def _executar(self, funcao, *args, **kwargs):
+        import asyncio
+
+        if self._executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+
+            self._executor = ThreadPoolExecutor(max_workers=self.db_manager.pool_size, thread_name_prefix="aicluster-db")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(funcao, *args, **kwargs))
+
+    def _obter_pool(self):
+        if self._pool is None:
+            db = self.db_manager
+            self._pool = PoolConexoesAsync(self._criar_conexao, db.pool_size, self._verificar_conexao,
+                                           max_ocioso=db.pool_max_ocioso, verificar_apos=db.pool_verificar_apos,
+                                           timeout=db.pool_timeout)
+        return self._pool
+
+    async def _criar_conexao(self):
+        import mysql.connector.aio
+
+        db = self.db_manager
+        return await mysql.connector.aio.connect(host=db.host, port=db.port or 3306, user=db.user,
+                                                 password=db.password, database=db.database)
+
+    @staticmethod
+    async def _verificar_conexao(conn):
+        await conn.ping(reconnect=False)
+
+    @staticmethod
+    async def _reverter(conn, erro=None):
+        # Mesmo critério do DatabaseManager._reverter: descarta a conexão se o rollback
+        # falhar ou se o erro indicar conexão perdida
+        try:
+            await conn.rollback()
+        except Exception:
+            return False
+        if erro is None:
+            return True
+        return not any(classe.__name__ in ("OperationalError", "InterfaceError") for classe in type(erro).__mro__)
+
+    async def _consultar(self, query, params=None):
+        pool = self._obter_pool()
+        conn = await pool.obter()
+        descartar = False
+        try:
+            cursor = await conn.cursor()
+            try:
+                with instrumentacao.medir("db.consulta"):
+                    await cursor.execute(query, params or None)
+                    resultado = await cursor.fetchall() if cursor.description is not None else []
+                    await conn.commit()
+            finally:
+                await cursor.close()
+            instrumentacao.contar("db.linhas_lidas", len(resultado))
+            return resultado
+        except Exception as e:
+            print(f"Erro ao executar query: {e}")
+            descartar = not await self._reverter(conn, e)
+            raise
+        finally:
+            await pool.devolver(conn, descartar)
+
+    async def _iterar_query(self, query, params=None, tamanho_lote=1000):
+        pool = self._obter_pool()
+        conn = await pool.obter()
+        cursor = None
+        erro = None
+        try:
+            # Cursor sem buffer: as linhas são lidas do socket conforme o fetchmany
+            cursor = await conn.cursor(buffered=False)
+            with instrumentacao.medir("db.consulta"):
+                await cursor.execute(query, params or None)
+            while True:
+                with instrumentacao.medir("db.fetch"):
+                    linhas = await cursor.fetchmany(tamanho_lote)
+                if not linhas:
+                    break
+                instrumentacao.contar("db.linhas_lidas", len(linhas))
+                yield linhas
+        except Exception as e:
+            print(f"Erro ao executar query: {e}")
+            erro = e
+            raise
+        finally:
+            try:
+                # Descarta o restante do resultado se o consumidor parou antes do fim
+                await conn.consume_results()
+                if cursor is not None:
+                    await cursor.close()
+                reutilizavel = await self._reverter(conn, erro)
+            except Exception:
+                reutilizavel = False
+            await pool.devolver(conn, not reutilizavel)
+
+    async def _inserir_lote(self, nome_tabela, colunas, linhas):
+        db = self.db_manager
+        sql = db.cache_instrucoes.obter(("insert", nome_tabela, colunas, False),
+                                        lambda: db._montar_insert(nome_tabela, colunas))
+        pool = self._obter_pool()
+        conn = await pool.obter()
+        descartar = False
+        try:
+            cursor = await conn.cursor()
+            try:
+                with instrumentacao.medir("db.insercao"):
+                    await cursor.executemany(sql, linhas)
+                with instrumentacao.medir("db.commit"):
+                    await conn.commit()
+            finally:
+                await cursor.close()
+            instrumentacao.contar("db.linhas_inseridas", len(linhas))
+        except Exception as e:
+            descartar = not await self._reverter(conn, e)
+            raise
+        finally:
+            await pool.devolver(conn, descartar)
+
+    async def _execute_query(self, query, params=None):
+        if self.nativo:
+            return await self._consultar(query, params)
+        return await self._executar(self.db_manager._execute_query, query, params)
+
+    async def carregar_dados(self, nome_tabela, colunas="*", where=None, filtros=None):
+        if not self.nativo or self.db_manager.cache_resultados is not None:
+            return await self._executar(self.db_manager.carregar_dados, nome_tabela, colunas, where, filtros)
+        query, params = self.db_manager._montar_select(nome_tabela, colunas, where, filtros)
+        return await self._consultar(query, params)
+
+    async def carregar_arrays(self, nome_tabela, colunas_features, coluna_label, where=None, tamanho_lote=None, dtype_features=None):
+        if not self.nativo or self.db_manager.cache_resultados is not None:
+            return await self._executar(self.db_manager.carregar_arrays, nome_tabela, colunas_features, coluna_label,
+                                        where, tamanho_lote, dtype_features)
+        db = self.db_manager
+        with instrumentacao.medir("db.carregar_arrays"):
+            query, params = db._query_tipos_colunas(nome_tabela)
+            tipos = db._ler_tipos_colunas(await self._consultar(query, params))
+            montador = MontadorArrays(nome_tabela, tipos, colunas_features, coluna_label, dtype_features, db.db_type)
+            montador.alocar((await self._consultar(montador.query_contagem(where)))[0][0])
+            lotes = self.carregar_dados_em_lotes(nome_tabela, montador.colunas, where, tamanho_lote)
+            try:
+                async for linhas in lotes:
+                    if montador.adicionar(linhas):
+                        break
+            finally:
+                await lotes.aclose()
+            return montador.resultado()
+
+    async def salvar_dados(self, dados, nome_tabela, tamanho_lote=None, usar_copy=False):
+        if not self.nativo:
+            return await self._executar(self.db_manager.salvar_dados, dados, nome_tabela, tamanho_lote, usar_copy)
+        # Mesmo contrato do DatabaseManager.salvar_dados: uma transação por lote e um resumo no final
+        db = self.db_manager
+        total = 0
+        inicio = time.perf_counter()
+        try:
+            for colunas, linhas in db._agrupar_em_lotes(dados, tamanho_lote or db.tamanho_lote):
+                await self._inserir_lote(nome_tabela, colunas, linhas)
+                total += len(linhas)
+        except Exception as e:
+            print(f"Erro ao salvar dados: {e}")
+        if total:
+            db.invalidar_cache(nome_tabela)
+        duracao = time.perf_counter() - inicio
+        linhas_por_segundo = total / duracao if duracao > 0 else 0.0
+        print(f"{total} linhas salvas em {nome_tabela} ({linhas_por_segundo:.0f} linhas/s)")
+        return {"linhas": total, "segundos": duracao, "linhas_por_segundo": linhas_por_segundo}
+
+    async def carregar_dados_em_lotes(self, nome_tabela, colunas="*", where=None, tamanho_lote=None, filtros=None):
+        # Gerador assíncrono. Ao sair de um `async for` com break, use contextlib.aclosing para
+        # que a conexão volte ao pool na hora.
+        if self.nativo:
+            query, params = self.db_manager._montar_select(nome_tabela, colunas, where, filtros)
+            lotes = self._iterar_query(query, params, tamanho_lote or self.db_manager.tamanho_lote)
+            try:
+                async for linhas in lotes:
+                    yield linhas
+            finally:
+                await lotes.aclose()
+            return
+        # Cada lote é buscado no executor, sem bloquear o event loop
+        gerador = self.db_manager.carregar_dados_em_lotes(nome_tabela, colunas, where, tamanho_lote, filtros)
+        try:
+            while True:
+                linhas = await self._executar(next, gerador, None)
+                if linhas is None:
+                    return
+                yield linhas
+        finally:
+            # Devolve a conexão ao pool mesmo se o consumidor parar antes do fim
+            try:
+                await self._executar(gerador.close)
+            except RuntimeError:
+                gerador.close()  # O executor já foi encerrado por close()
+
+    def metricas_pool(self):
+        if self.nativo:
+            return self._obter_pool().metricas()
+        return self.db_manager.metricas_pool()
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.fechar_todas()
+            self._pool = None
+        if self._executor is not None:
+            await self._executar(self.db_manager.close)
+            self._executor.shutdown(wait=True)  # Novas chamadas ao executor levantam RuntimeError
+        else:
+            self.db_manager.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
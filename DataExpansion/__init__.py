@@ -1,14 +1,39 @@
 # __init__.py
 
+# A importação do pacote não lê stdin, não abre conexões e não carrega drivers de banco
+# nem bibliotecas de ML: os treinadores só são importados no primeiro acesso.
+
+__version__ = "1.0.0"
+__author__ = "quaghate"
+
+__all__ = ['DatabaseManager', 'DatabaseManagerAsync', 'TreinadorIA', 'TreinadorIATensorFlow', 'TreinadorIAScikitLearn', 'BuscaHiperparametros', 'setup_database_connection']
+
+# As classes de banco são importadas já aqui (~12 ms, drivers só na primeira conexão): como os
+# submódulos têm o mesmo nome das classes, importar DataExpansion.DatabaseManager depois
+# trocaria um atributo preenchido sob demanda pelo módulo. Aqui o módulo é carregado antes e
+# o nome fica com a classe.
 from DataExpansion.DatabaseManager import DatabaseManager
-from DataExpansion.Treinador_IA import Treinador_IA
+from DataExpansion.DatabaseManagerAsync import DatabaseManagerAsync
+
+_TREINADORES = ('TreinadorIA', 'TreinadorIATensorFlow', 'TreinadorIAScikitLearn')
 
-print('Iniciando o AICluster')
 
-__all__ = ['DatabaseManager', 'Treinador_IA']
+def __getattr__(nome):
+    if nome == 'BuscaHiperparametros':
+        from DataExpansion.busca_hiperparametros import BuscaHiperparametros as valor
+    elif nome in _TREINADORES:
+        from DataExpansion import treining
+        valor = getattr(treining, nome)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+    globals()[nome] = valor
+    return valor
+
 
-# Função para configurar a conexão com o banco de dados
+# Função para configurar a conexão com o banco de dados de forma interativa
 def setup_database_connection():
+    from DataExpansion.DatabaseManager import DatabaseManager
+
     db_type = input("Digite o tipo de banco de dados (mysql/sqlite), caso deseje pular essa parte, digite qualquer coisa. ").lower()
 
     if db_type == "mysql":
@@ -30,25 +55,10 @@ def setup_database_connection():
 
     try:
         db_manager = DatabaseManager(**db_config)
-        connection = db_manager._get_connection()
-        print(f"{db_type.capitalize()} iniciado com sucesso")
+        with db_manager.conexao():
+            print(f"{db_type.capitalize()} iniciado com sucesso")
         return db_manager
     except Exception as e:
         print(f"Ocorreu o erro: {e}")
         print("Quando for executar o código, tente usar SQLite, que é um banco de dados embutido no Python.")
         return None
-
-# Inicializar conexão
-db_manager = setup_database_connection()
-
-# Fechar conexão no final
-if db_manager:
-    db_manager.close()
-
-__version__ = "1.0.0"
-print(f"Versão: {__version__}")
-
-__author__ = "quaghate"
-print(f"Autor: {__author__}")
-
-print("Inicialização concluída")
@@ -0,0 +1,116 @@
+import itertools
+import random
+import time
+
+from DataExpansion.instrumentacao import instrumentacao, executar_com_metricas
+
+
+def _avaliar_trial(especificacao, parametros, compartilhados, fracao, devolver_modelo):
+    # Executado nos workers: monta o treinador com os hiperparâmetros do trial, treina nas
+    # primeiras `fracao` linhas do split compartilhado e mede a precisão no conjunto de teste
+    from DataExpansion.treining import TreinadorIA
+
+    classe, args, kwargs = especificacao
+    parametros = dict(parametros)
+    diretorio_temporario, num_iteracoes = args
+    num_iteracoes = parametros.pop('num_iteracoes', num_iteracoes)
+    treinador = TreinadorIA.a_partir_da_especificacao((classe, (diretorio_temporario, num_iteracoes), dict(kwargs, **parametros)))
+    dados = compartilhados.anexar()
+    # O split já foi embaralhado uma vez; uma fatia inicial é uma amostra aleatória sem cópia
+    num_linhas = max(1, int(len(dados["x_treino"]) * fracao))
+    x_treino, y_treino = dados["x_treino"][:num_linhas], dados["y_treino"][:num_linhas]
+
+    inicio = time.perf_counter()
+    if 'batch_size' not in parametros:
+        treinador.controlador.estimar_batch(x_treino)
+    with instrumentacao.medir("treino.ajuste"):
+        treinador.controlador.executar_com_recuo(lambda batch_size: treinador.ajustar_modelo(x_treino, y_treino, batch_size))
+    precisao = treinador.avaliar_modelo(dados["x_teste"], dados["y_teste"])
+    segundos = time.perf_counter() - inicio
+    modelo = treinador.exportar_modelo(treinador.modelo) if devolver_modelo else None
+    return precisao, segundos, modelo
+
+
+def _executar_trial(tarefa):
+    indice, argumentos = tarefa
+    return indice, executar_com_metricas(_avaliar_trial, *argumentos)
+
+
+class BuscaHiperparametros:
+    # Busca em grade ou aleatória sobre os kwargs de um TreinadorIA (layers, optimizer,
+    # n_estimators, batch_size, num_iteracoes...), executada no pool de processos do treinador.
+    # Usa successive halving: todos os trials começam com uma fração pequena do conjunto de
+    # treino e, a cada rodada, só o melhor 1/fator_reducao segue com fator_reducao vezes mais
+    # dados. O split treino/teste é feito uma única vez e compartilhado com os workers via mmap.
+    def __init__(self, treinador, espaco, modo="grade", num_amostras=10, fator_reducao=3, fracao_minima=None,
+                 criterio="precisao_por_segundo", semente=42):
+        self.treinador = treinador
+        self.espaco = espaco  # {parâmetro: lista de valores ou distribuição com .rvs()}
+        self.modo = modo
+        self.num_amostras = num_amostras
+        if fator_reducao < 2:
+            raise ValueError("fator_reducao precisa ser pelo menos 2.")
+        self.fator_reducao = fator_reducao
+        self.fracao_minima = fracao_minima
+        self.criterio = criterio  # "precisao_por_segundo" ou "precisao"
+        self.semente = semente
+
+    def gerar_trials(self):
+        nomes = list(self.espaco)
+        if self.modo == "grade":
+            return [dict(zip(nomes, valores)) for valores in itertools.product(*(self.espaco[nome] for nome in nomes))]
+        gerador = random.Random(self.semente)
+        trials = []
+        for _ in range(self.num_amostras):
+            trial = {}
+            for nome in nomes:
+                valores = self.espaco[nome]
+                trial[nome] = valores.rvs(random_state=gerador.randrange(2 ** 32)) if hasattr(valores, "rvs") else gerador.choice(valores)
+            trials.append(trial)
+        return trials
+
+    def _preparar_split(self, dados):
+        return self.treinador.preparar_split(dados, self.semente)
+
+    def executar(self, dados, num_processos=None):
+        from DataExpansion.treining import mapear_com_limite
+
+        trials = self.gerar_trials()
+        # Menor número de rodadas com fator_reducao ** num_rodadas >= len(trials), em aritmética
+        # inteira (math.log(27, 3) dá 3.0000000000000004 e criaria uma rodada a mais)
+        num_rodadas = 1
+        while self.fator_reducao ** num_rodadas < len(trials):
+            num_rodadas += 1
+        fracao = self.fracao_minima or self.fator_reducao ** -(num_rodadas - 1)
+        resultados = [{"parametros": trial, "rodada": 0, "fracao": 0.0, "precisao": None, "segundos": None,
+                       "precisao_por_segundo": None, "modelo": None} for trial in trials]
+        especificacao = self.treinador.especificacao()
+        compartilhados = self._preparar_split(dados)
+        vivos = list(range(len(trials)))
+        try:
+            limite = self.treinador.controlador.estimar_instancias(num_processos or len(vivos),
+                                                                   self.treinador.kwargs.get('memoria_por_instancia'))
+            pool = self.treinador._obter_pool(limite)
+            for rodada in range(1, num_rodadas + 1):
+                ultima = rodada == num_rodadas
+                fracao_rodada = 1.0 if ultima else min(1.0, fracao)
+                tarefas = [(indice, (especificacao, trials[indice], compartilhados, fracao_rodada, ultima)) for indice in vivos]
+                resultados_rodada = mapear_com_limite(pool, _executar_trial, tarefas, limite, ordenado=False)
+                for indice, ((precisao, segundos, modelo), metricas) in resultados_rodada:
+                    instrumentacao.mesclar(metricas)
+                    resultados[indice].update(rodada=rodada, fracao=fracao_rodada, precisao=precisao, segundos=segundos,
+                                              precisao_por_segundo=precisao / segundos if segundos > 0 else float("inf"),
+                                              modelo=modelo)
+                print(f"Rodada {rodada}/{num_rodadas}: {len(vivos)} trial(s) com {fracao_rodada:.0%} dos dados de treino")
+                if ultima:
+                    break
+                # Successive halving: só o melhor 1/fator_reducao segundo o critério continua
+                vivos.sort(key=lambda indice: resultados[indice][self.criterio], reverse=True)
+                vivos = vivos[:max(1, len(vivos) // self.fator_reducao)]
+                fracao *= self.fator_reducao
+        finally:
+            compartilhados.liberar()
+
+        classificacao = sorted(resultados, key=lambda r: (r["rodada"], r[self.criterio] or 0.0), reverse=True)
+        vencedor = classificacao[0]
+        return {"vencedor": vencedor, "modelo": vencedor["modelo"], "classificacao": classificacao}
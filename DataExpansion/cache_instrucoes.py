@@ -0,0 +1,101 @@
+import itertools
+import threading
+import weakref
+from collections import OrderedDict
+
+# Nomes de instruções preparadas no PostgreSQL são únicos no processo, então esquecer o
+# registro de uma conexão nunca causa colisão com uma instrução que ainda exista no servidor
+_contador_nomes = itertools.count(1)
+
+
+class CacheInstrucoes:
+    # Cache LRU em dois níveis para consultas repetidas do DatabaseManager:
+    #  - o texto SQL montado, indexado pela forma da consulta (tabela, colunas, filtros),
+    #    para não refazer f-strings a cada chamada;
+    #  - por conexão, as instruções preparadas no servidor (PREPARE no PostgreSQL, cursores
+    #    preparados no MySQL), para que o servidor não reanalise o SQL.
+    # No SQLite o próprio sqlite3 mantém o cache de instruções por conexão (cached_statements).
+    def __init__(self, tamanho_maximo=128):
+        self.tamanho_maximo = tamanho_maximo
+        self._instrucoes = OrderedDict()
+        self._preparadas = weakref.WeakKeyDictionary()  # conexão -> OrderedDict(sql -> nome/cursor)
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    def obter(self, chave, montar):
+        with self._lock:
+            sql = self._instrucoes.get(chave)
+            if sql is not None:
+                self._instrucoes.move_to_end(chave)
+                self.acertos += 1
+                return sql
+            self.falhas += 1
+        sql = montar()
+        with self._lock:
+            self._instrucoes[chave] = sql
+            if len(self._instrucoes) > self.tamanho_maximo:
+                self._instrucoes.popitem(last=False)
+        return sql
+
+    def _registro(self, conn):
+        # Cada conexão é usada por uma thread de cada vez (garantido pelo pool)
+        registro = self._preparadas.get(conn)
+        if registro is None:
+            registro = self._preparadas[conn] = OrderedDict()
+        return registro
+
+    def preparar_postgresql(self, conn, cursor, sql, num_parametros):
+        # Devolve o EXECUTE equivalente a sql, preparando-o na conexão na primeira vez
+        registro = self._registro(conn)
+        nome = registro.get(sql)
+        if nome is None:
+            nome = f"aicluster_stmt_{next(_contador_nomes)}"
+            partes = sql.split('%s')
+            numerado = partes[0] + ''.join(f"${i}{parte}" for i, parte in enumerate(partes[1:], start=1))
+            cursor.execute(f"PREPARE {nome} AS {numerado}")
+            registro[sql] = nome
+            if len(registro) > self.tamanho_maximo:
+                _, antigo = registro.popitem(last=False)
+                cursor.execute(f"DEALLOCATE {antigo}")
+        else:
+            registro.move_to_end(sql)
+        if not num_parametros:
+            return f"EXECUTE {nome}"
+        return f"EXECUTE {nome} ({', '.join(['%s'] * num_parametros)})"
+
+    def descartar_postgresql(self, conn, cursor, sql):
+        # Remove a instrução preparada para sql (ex.: plano invalidado por um ALTER TABLE),
+        # para que o próximo preparar_postgresql a prepare de novo
+        nome = self._registro(conn).pop(sql, None)
+        if nome is not None:
+            cursor.execute(f"DEALLOCATE {nome}")
+
+    def cursor_mysql(self, conn, sql):
+        # Um cursor preparado por instrução: o mysql.connector só reenvia o PREPARE quando o SQL muda
+        registro = self._registro(conn)
+        cursor = registro.get(sql)
+        if cursor is None:
+            cursor = conn.cursor(prepared=True)
+            registro[sql] = cursor
+            if len(registro) > self.tamanho_maximo:
+                _, antigo = registro.popitem(last=False)
+                antigo.close()
+        else:
+            registro.move_to_end(sql)
+        return cursor
+
+    def esquecer(self, conn):
+        # Após um erro o estado das instruções na conexão é incerto; elas são preparadas de novo
+        registro = self._preparadas.pop(conn, None)
+        if registro:
+            for handle in registro.values():
+                if not isinstance(handle, str):
+                    try:
+                        handle.close()
+                    except Exception:
+                        pass
+
+    def estatisticas(self):
+        with self._lock:
+            return {"acertos": self.acertos, "falhas": self.falhas, "instrucoes": len(self._instrucoes)}
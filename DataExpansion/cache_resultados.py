@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+_ARRAY_UNICO = "valor"  # Nome do .npy quando o resultado é um único array e não um dict
+
+
+def _tamanho_estimado(valor):
+    # Arrays contam pelos bytes de dados; listas de tuplas, pelo tamanho dos objetos Python
+    if hasattr(valor, "nbytes"):
+        return valor.nbytes
+    if isinstance(valor, dict):
+        return sum(_tamanho_estimado(item) for item in valor.values())
+    if isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor) + sum(_tamanho_estimado(item) for item in valor)
+    return sys.getsizeof(valor)
+
+
+class CacheResultados:
+    # Cache read-through dos resultados de consultas, limitado em bytes (LRU) e com TTL.
+    # Resultados que são arrays NumPy (ou dicts de arrays, como os de carregar_arrays) também
+    # podem ir para disco em diretorio_cache como .npy, reabertos com mmap_mode='r' por outros
+    # processos. As entradas de uma tabela são descartadas por invalidar(tabela).
+    # `banco` identifica o banco de origem (ex.: tipo e caminho): vários bancos podem dividir
+    # o mesmo diretorio_cache, cada um na sua subpasta, sem que tabelas de mesmo nome colidam.
+    def __init__(self, tamanho_maximo=256 * 1024 * 1024, ttl=300.0, diretorio_cache=None, tamanho_maximo_disco=None,
+                 banco=None):
+        self.tamanho_maximo = tamanho_maximo
+        self.ttl = ttl
+        self.raiz_cache = diretorio_cache  # tamanho_maximo_disco vale para a raiz inteira
+        self.diretorio_cache = diretorio_cache
+        if diretorio_cache and banco is not None:
+            self.diretorio_cache = os.path.join(diretorio_cache, self.chave(banco)[:32])
+        self.tamanho_maximo_disco = tamanho_maximo_disco
+        self._entradas = OrderedDict()  # chave -> (valor, criado_em, tamanho, tabela)
+        self._tamanho_total = 0
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    @staticmethod
+    def chave(*partes):
+        return hashlib.sha256(repr(partes).encode('utf-8')).hexdigest()
+
+    def obter(self, tabela, chave, carregar):
+        valor = self._obter_memoria(chave)
+        if valor is None:
+            valor = self._obter_disco(tabela, chave)
+            if valor is not None:
+                self._guardar_memoria(tabela, chave, valor)
+        if valor is not None:
+            with self._lock:
+                self.acertos += 1
+            return valor
+        with self._lock:
+            self.falhas += 1
+        valor = carregar()
+        self._guardar_memoria(tabela, chave, valor)
+        self._guardar_disco(tabela, chave, valor)
+        return valor
+
+    def _expirado(self, criado_em):
+        return self.ttl is not None and time.time() - criado_em > self.ttl
+
+    def _obter_memoria(self, chave):
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                return None
+            if self._expirado(entrada[1]):
+                self._remover(chave)
+                return None
+            self._entradas.move_to_end(chave)
+            return entrada[0]
+
+    def _guardar_memoria(self, tabela, chave, valor):
+        tamanho = _tamanho_estimado(valor)
+        if tamanho > self.tamanho_maximo:
+            return
+        with self._lock:
+            if chave in self._entradas:
+                self._remover(chave)
+            self._entradas[chave] = (valor, time.time(), tamanho, tabela)
+            self._tamanho_total += tamanho
+            while self._tamanho_total > self.tamanho_maximo:
+                self._remover(next(iter(self._entradas)))
+
+    def _remover(self, chave):
+        _, _, tamanho, _ = self._entradas.pop(chave)
+        self._tamanho_total -= tamanho
+
+    def _diretorio_entrada(self, tabela, chave):
+        return os.path.join(self.diretorio_cache, tabela, chave)
+
+    def _obter_disco(self, tabela, chave):
+        if not self.diretorio_cache:
+            return None
+        diretorio = self._diretorio_entrada(tabela, chave)
+        try:
+            with open(os.path.join(diretorio, "meta.json"), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self._expirado(meta["criado_em"]):
+            shutil.rmtree(diretorio, ignore_errors=True)
+            return None
+        import numpy as np
+
+        os.utime(diretorio)  # Marca o uso para a remoção LRU em disco
+        arrays = {nome: np.load(os.path.join(diretorio, f"{nome}.npy"), mmap_mode='r') for nome in meta["arrays"]}
+        return arrays[_ARRAY_UNICO] if meta["simples"] else arrays
+
+    def _guardar_disco(self, tabela, chave, valor):
+        if not self.diretorio_cache:
+            return
+        import numpy as np
+
+        simples = isinstance(valor, np.ndarray)
+        arrays = {_ARRAY_UNICO: valor} if simples else valor
+        if not isinstance(arrays, dict) or not all(isinstance(a, np.ndarray) and a.dtype != object for a in arrays.values()):
+            return  # Só arrays NumPy podem ser reabertos com mmap
+        diretorio = self._diretorio_entrada(tabela, chave)
+        temporario = f"{diretorio}.{os.getpid()}.tmp"
+        os.makedirs(temporario, exist_ok=True)
+        for nome, array in arrays.items():
+            np.save(os.path.join(temporario, f"{nome}.npy"), array)
+        with open(os.path.join(temporario, "meta.json"), 'w', encoding='utf-8') as f:
+            json.dump({"criado_em": time.time(), "arrays": list(arrays), "simples": simples}, f)
+        shutil.rmtree(diretorio, ignore_errors=True)
+        try:
+            os.replace(temporario, diretorio)  # Outro processo pode ter gravado a mesma entrada
+        except OSError:
+            shutil.rmtree(temporario, ignore_errors=True)
+        self._limitar_disco()
+
+    def _limitar_disco(self):
+        if not self.tamanho_maximo_disco:
+            return
+        entradas = []
+        for raiz, _, arquivos in os.walk(self.raiz_cache):
+            if "meta.json" in arquivos:
+                tamanho = sum(os.path.getsize(os.path.join(raiz, arquivo)) for arquivo in arquivos)
+                entradas.append((os.path.getmtime(raiz), tamanho, raiz))
+        total = sum(tamanho for _, tamanho, _ in entradas)
+        for _, tamanho, raiz in sorted(entradas):
+            if total <= self.tamanho_maximo_disco:
+                break
+            shutil.rmtree(raiz, ignore_errors=True)
+            total -= tamanho
+
+    def invalidar(self, tabela=None):
+        with self._lock:
+            for chave in [chave for chave, entrada in self._entradas.items() if tabela is None or entrada[3] == tabela]:
+                self._remover(chave)
+        if self.diretorio_cache:
+            shutil.rmtree(self.diretorio_cache if tabela is None else os.path.join(self.diretorio_cache, tabela), ignore_errors=True)
+
+    def estatisticas(self):
+        with self._lock:
+            return {"acertos": self.acertos, "falhas": self.falhas, "entradas": len(self._entradas), "bytes": self._tamanho_total}
@@ -0,0 +1,55 @@
+import glob
+import os
+
+
+class ArmazemCheckpoints:
+    # Guarda checkpoints com joblib em diretorio/checkpoints, um arquivo por instância e rodada,
+    # para que instâncias paralelas não sobrescrevam o mesmo caminho.
+    # compressao segue o parâmetro `compress` do joblib (0 = sem compressão, 3, ('lz4', 3)...).
+    # Checkpoints sem compressão podem ser abertos com mmap=True: os arrays ficam mapeados em
+    # memória e vários processos de inferência compartilham uma única cópia deles.
+    def __init__(self, diretorio, compressao=0, manter_ultimos=None):
+        self.diretorio = os.path.join(diretorio, "checkpoints")
+        self.compressao = compressao
+        self.manter_ultimos = manter_ultimos  # Quantos checkpoints manter por nome (None = todos)
+
+    def caminho(self, nome, instancia=None, rodada=None):
+        partes = [nome]
+        if rodada is not None:
+            partes.append(f"r{rodada:04d}")
+        if instancia is not None:
+            partes.append(f"i{instancia:03d}")
+        return os.path.join(self.diretorio, "_".join(partes) + ".joblib")
+
+    def salvar(self, objeto, nome, instancia=None, rodada=None):
+        from joblib import dump
+
+        os.makedirs(self.diretorio, exist_ok=True)
+        caminho = self.caminho(nome, instancia, rodada)
+        # Grava num arquivo temporário e renomeia: um leitor nunca vê um checkpoint pela metade
+        temporario = f"{caminho}.{os.getpid()}.tmp"
+        dump(objeto, temporario, compress=self.compressao)
+        os.replace(temporario, caminho)
+        if self.manter_ultimos:
+            self._remover_antigos(nome)
+        return caminho
+
+    def carregar(self, caminho, mmap=False):
+        from joblib import load
+
+        if mmap and self.compressao:
+            print(f"O checkpoint {caminho} foi salvo com compressão e não pode ser mapeado em memória; carregando normalmente.")
+            mmap = False
+        return load(caminho, mmap_mode='r' if mmap else None)
+
+    def listar(self, nome):
+        padrao = os.path.join(self.diretorio, f"{glob.escape(nome)}*.joblib")
+        return sorted(glob.glob(padrao), key=os.path.getmtime)
+
+    def ultimo(self, nome):
+        checkpoints = self.listar(nome)
+        return checkpoints[-1] if checkpoints else None
+
+    def _remover_antigos(self, nome):
+        for caminho in self.listar(nome)[:-self.manter_ultimos]:
+            os.remove(caminho)
@@ -0,0 +1,81 @@
+import gc
+import os
+
+
+
+class ControladorRecursos:
+    # Escolhe o maior tamanho de lote e o maior número de instâncias paralelas que cabem
+    # em memoria_maxima/cpu_maximo, e recua (reduz o lote e tenta de novo) quando falta
+    # memória durante o treinamento, em vez de encerrar o processo.
+    def __init__(self, memoria_maxima=None, cpu_maximo=None, batch_inicial=32, batch_minimo=1, batch_maximo=4096,
+                 fator_memoria_amostra=4.0, fracao_segura=0.8, max_tentativas=8):
+        self.memoria_maxima = memoria_maxima  # Limite de memória usada no sistema (em bytes)
+        self.cpu_maximo = cpu_maximo  # Limite de uso de CPU (em porcentagem)
+        self.batch_size = batch_inicial
+        self.batch_minimo = batch_minimo
+        self.batch_maximo = batch_maximo
+        self.fator_memoria_amostra = fator_memoria_amostra  # Ativações e gradientes por byte de entrada
+        self.fracao_segura = fracao_segura
+        self.max_tentativas = max_tentativas
+
+    def memoria_livre(self):
+        import psutil  # Importado no uso, para não pesar na importação de treining
+
+        memoria = psutil.virtual_memory()
+        livre = memoria.available
+        if self.memoria_maxima:
+            livre = min(livre, self.memoria_maxima - memoria.used)
+        return max(0, int(livre * self.fracao_segura))
+
+    def estimar_batch(self, x):
+        # Maior potência de dois cujo lote (com ativações) cabe na memória livre
+        num_amostras = len(x)
+        if not num_amostras or not hasattr(x, "nbytes"):
+            return self.batch_size
+        bytes_por_amostra = max(1, x.nbytes // num_amostras) * self.fator_memoria_amostra
+        limite = min(self.batch_maximo, num_amostras, int(self.memoria_livre() // bytes_por_amostra))
+        batch = self.batch_minimo
+        while batch * 2 <= limite:
+            batch *= 2
+        self.batch_size = max(self.batch_minimo, batch)
+        return self.batch_size
+
+    def estimar_instancias(self, solicitadas, memoria_por_instancia=None):
+        # Limita os processos simultâneos pela memória livre e pela fração de CPUs permitida
+        if memoria_por_instancia is None:
+            import psutil
+
+            memoria_por_instancia = psutil.Process().memory_info().rss
+        maximo = solicitadas
+        if memoria_por_instancia:
+            maximo = min(maximo, self.memoria_livre() // memoria_por_instancia)
+        num_cpus = os.cpu_count() or 1
+        if self.cpu_maximo:
+            maximo = min(maximo, int(num_cpus * self.cpu_maximo / 100))
+        return max(1, int(maximo))
+
+    def reduzir_batch(self):
+        if self.batch_size <= self.batch_minimo:
+            return False
+        self.batch_size = max(self.batch_minimo, self.batch_size // 2)
+        return True
+
+    @staticmethod
+    def falta_de_memoria(erro):
+        # ResourceExhaustedError vem do TensorFlow, que não é importado aqui
+        return isinstance(erro, MemoryError) or type(erro).__name__ == "ResourceExhaustedError"
+
+    def executar_com_recuo(self, funcao, monitor=None):
+        # Chama funcao(batch_size); a cada falta de memória libera lixo, reduz o lote e tenta de novo
+        for tentativa in range(1, self.max_tentativas + 1):
+            if monitor is not None and any(evento["tipo"] == 'memory_error' for evento in monitor.eventos_pendentes()):
+                self.reduzir_batch()
+            try:
+                return funcao(self.batch_size)
+            except Exception as e:
+                if not self.falta_de_memoria(e) or tentativa == self.max_tentativas:
+                    raise
+                gc.collect()
+                if not self.reduzir_batch():
+                    raise
+                print(f"Memória insuficiente, tentando novamente com batch_size={self.batch_size} ({tentativa}/{self.max_tentativas})")
@@ -0,0 +1,43 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+
+class DadosCompartilhados:
+    # Grava cada array do dataset uma única vez em .npy dentro do diretório temporário.
+    # Só os caminhos são serializados para os workers, que abrem os arquivos com mmap
+    # e compartilham as mesmas páginas do cache do sistema operacional.
+    def __init__(self, dados, diretorio_temporario):
+        self.diretorio = tempfile.mkdtemp(prefix="dados_compartilhados_", dir=diretorio_temporario)
+        self.caminhos = {}
+        self.valores = {}
+        for chave, valor in dados.items():
+            # Arrays de objetos (ex.: labels de texto) não podem ser abertos com mmap e vão serializados
+            if isinstance(valor, np.ndarray) and valor.dtype != object:
+                caminho = os.path.join(self.diretorio, f"{chave}.npy")
+                np.save(caminho, np.ascontiguousarray(valor))
+                self.caminhos[chave] = caminho
+            else:
+                self.valores[chave] = valor
+
+    @classmethod
+    def a_partir_de_arquivos(cls, caminhos, valores=None):
+        # Publica .npy que já existem (ex.: do cache de pré-processamento) sem regravá-los;
+        # liberar() não apaga esses arquivos
+        compartilhados = cls.__new__(cls)
+        compartilhados.diretorio = None
+        compartilhados.caminhos = dict(caminhos)
+        compartilhados.valores = dict(valores or {})
+        return compartilhados
+
+    def anexar(self):
+        dados = dict(self.valores)
+        for chave, caminho in self.caminhos.items():
+            dados[chave] = np.load(caminho, mmap_mode='r')
+        return dados
+
+    def liberar(self):
+        if self.diretorio is not None:
+            shutil.rmtree(self.diretorio, ignore_errors=True)
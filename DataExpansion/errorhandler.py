@@ -7,7 +7,6 @@ import gc
 
 class ErrorHandler:
     def __init__(self, language='pt'):
-        self.language = self.escolher_idioma(language)
         self.error_messages = {
             'pt': {
                 'file_not_found': 'O arquivo "{file}" não foi encontrado.',
@@ -95,11 +94,12 @@ class ErrorHandler:
                 'KeyError': 'The key "{chave}" was not found in the dictionary.'
             }
         }
+        self.language = self.escolher_idioma(language)
 
     def escolher_idioma(self, language):
         if language in self.error_messages:
             return language
-        
+        return 'pt'
 
     def get_message(self, error_code, *args):
         return self.error_messages[self.language].get(error_code, 'Erro desconhecido').format(*args)
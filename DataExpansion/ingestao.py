@@ -0,0 +1,189 @@
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import re
+
+_ESPACOS_JSON = re.compile(r'[ \t\n\r]*')  # Os mesmos espaços aceitos pelo módulo json
+_CONTINUACAO_NUMERO = re.compile(r'[0-9.eE+\-]*\Z')
+_INTERVALO_VERIFICACAO = 1.0  # Segundos sem lotes antes de conferir se os leitores ainda estão vivos
+
+
+def ler_arquivo_em_lotes(filepath, tamanho_lote=1000, pular_linhas=0):
+    # Lê um arquivo de dados de treinamento gerando listas de até tamanho_lote dicts,
+    # sem carregar o arquivo inteiro (exceto YAML, que não tem parser incremental aqui).
+    # pular_linhas descarta as linhas já gravadas numa ingestão anterior interrompida.
+    filename = os.path.basename(filepath)
+    if filename.endswith(".json"):
+        with open(filepath, 'r', encoding='utf-8') as f:
+            yield from _agrupar(_iterar_json(f), tamanho_lote, pular_linhas)
+    elif filename.endswith((".jsonl", ".ndjson")):
+        with open(filepath, 'r', encoding='utf-8') as f:
+            yield from _agrupar((json.loads(linha) for linha in f if linha.strip()), tamanho_lote, pular_linhas)
+    elif filename.endswith(".csv"):
+        with open(filepath, 'r', encoding='utf-8', newline='') as f:
+            yield from _agrupar(csv.DictReader(f), tamanho_lote, pular_linhas)
+    elif filename.endswith((".yaml", ".yml")):
+        import yaml
+
+        with open(filepath, 'r', encoding='utf-8') as f:
+            yield from _agrupar(yaml.safe_load(f) or [], tamanho_lote, pular_linhas)
+    elif not pular_linhas:
+        yield [{"filepath": filepath, "filetype": filename.split('.')[-1]}]
+
+
+def _agrupar(itens, tamanho_lote, pular_linhas=0):
+    if pular_linhas:
+        itens = itertools.islice(itens, pular_linhas, None)
+    lote = []
+    for item in itens:
+        lote.append(item)
+        if len(lote) >= tamanho_lote:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def _iterar_json(f, tamanho_bloco=1 << 16):
+    # Decodifica os elementos de um array JSON no topo do arquivo um a um, lendo em blocos.
+    # Tão estrito quanto json.load: exatamente uma vírgula entre elementos e nada além de
+    # espaços depois do ']' final.
+    decodificador = json.JSONDecoder()
+    buffer, indice, fim_arquivo = '', 0, False
+
+    def ler():
+        # Descarta o que já foi consumido e anexa o próximo bloco
+        nonlocal buffer, indice, fim_arquivo
+        bloco = f.read(tamanho_bloco)
+        fim_arquivo = not bloco
+        buffer = buffer[indice:] + bloco
+        indice = 0
+
+    def pular_espacos():
+        # Avança até o próximo caractere significativo; False se o arquivo acabou antes
+        nonlocal indice
+        while True:
+            indice = _ESPACOS_JSON.match(buffer, indice).end()
+            if indice < len(buffer):
+                return True
+            if fim_arquivo:
+                return False
+            ler()
+
+    if not pular_espacos() or buffer[indice] != '[':
+        # Sem array no topo não há como fazer streaming: lê o documento inteiro
+        documento = json.loads(buffer[indice:] + f.read())
+        yield from documento if isinstance(documento, list) else [documento]
+        return
+    indice += 1
+    apos_valor = False  # True depois de um elemento, quando só ',' ou ']' são válidos
+    primeiro = True  # ']' logo após '[' fecha um array vazio; logo após ',' é erro
+    while True:
+        if not pular_espacos():
+            raise ValueError("Array JSON não foi fechado")
+        caractere = buffer[indice]
+        if apos_valor:
+            if caractere == ']':
+                break
+            if caractere != ',':
+                raise ValueError(f"Esperado ',' ou ']' no array JSON, encontrado {caractere!r}")
+            indice += 1
+            apos_valor = False
+            continue
+        if caractere == ']' and primeiro:
+            break
+        if caractere in ',]':
+            raise ValueError(f"Esperado um valor no array JSON, encontrado {caractere!r}")
+        try:
+            item, fim = decodificador.raw_decode(buffer, indice)
+        except json.JSONDecodeError:
+            if fim_arquivo:
+                raise
+            # Elemento cortado no fim do bloco
+            ler()
+            continue
+        if not fim_arquivo and isinstance(item, (int, float)) and _CONTINUACAO_NUMERO.match(buffer, fim):
+            # Um número no fim do buffer pode continuar no próximo bloco ("-6." + "02e23")
+            ler()
+            continue
+        yield item
+        indice = fim
+        apos_valor = True
+        primeiro = False
+    indice += 1
+    if pular_espacos():
+        raise ValueError(f"Conteúdo após o fim do array JSON: {buffer[indice:indice + 20]!r}")
+
+
+def _leitor(fila_arquivos, fila_lotes, tamanho_lote):
+    # Processo leitor: consome caminhos até receber None e envia os lotes pela fila limitada,
+    # que bloqueia quando o processo principal não acompanha (backpressure)
+    while True:
+        tarefa = fila_arquivos.get()
+        if tarefa is None:
+            fila_lotes.put(("fim", os.getpid(), None))
+            return
+        filepath, pular_linhas = tarefa
+        try:
+            for lote in ler_arquivo_em_lotes(filepath, tamanho_lote, pular_linhas):
+                fila_lotes.put(("lote", filepath, lote))
+        except Exception as e:
+            print(f"Erro ao carregar o arquivo {os.path.basename(filepath)}: {e}")
+            fila_lotes.put(("erro", filepath, str(e)))
+        else:
+            fila_lotes.put(("arquivo", filepath, None))
+
+
+def iterar_lotes_diretorio(arquivos, num_processos=None, tamanho_lote=1000, max_lotes_em_voo=None):
+    # Lê os arquivos em paralelo e gera ("lote", caminho, linhas) conforme ficam prontos,
+    # ("arquivo", caminho, None) quando um arquivo termina e ("erro", caminho, mensagem) se
+    # a leitura falhar. Os lotes de um mesmo arquivo chegam em ordem. No máximo
+    # max_lotes_em_voo lotes ficam na fila, então a memória não depende do tamanho do diretório.
+    # Cada item de arquivos é um caminho ou um par (caminho, linhas a pular).
+    arquivos = [item if isinstance(item, tuple) else (item, 0) for item in arquivos]
+    if not arquivos:
+        return
+    num_processos = max(1, min(num_processos or os.cpu_count() or 1, len(arquivos)))
+    fila_arquivos = multiprocessing.Queue()
+    fila_lotes = multiprocessing.Queue(maxsize=max_lotes_em_voo or 2 * num_processos)
+    for tarefa in arquivos:
+        fila_arquivos.put(tarefa)
+    for _ in range(num_processos):
+        fila_arquivos.put(None)
+
+    processos = [multiprocessing.Process(target=_leitor, args=(fila_arquivos, fila_lotes, tamanho_lote), daemon=True)
+                 for _ in range(num_processos)]
+    for processo in processos:
+        processo.start()
+    try:
+        finalizados = set()  # pids dos leitores que já enviaram "fim"
+        while len(finalizados) < num_processos:
+            try:
+                tipo, filepath, linhas = fila_lotes.get(timeout=_INTERVALO_VERIFICACAO)
+            except queue.Empty:
+                # Um leitor morto (ex.: OOM) nunca envia "fim"; sem esta verificação a espera seria eterna.
+                # Quem saiu com código 0 já enviou "fim", que pode ainda estar a caminho na fila.
+                for processo in processos:
+                    if processo.pid not in finalizados and not processo.is_alive() and processo.exitcode != 0:
+                        raise RuntimeError(f"Processo leitor {processo.pid} terminou inesperadamente "
+                                           f"(código de saída {processo.exitcode})")
+                continue
+            if tipo == "fim":
+                finalizados.add(filepath)
+            else:
+                yield tipo, filepath, linhas
+    finally:
+        # Se o consumidor parar antes do fim, os leitores podem estar bloqueados na fila cheia
+        for processo in processos:
+            if processo.is_alive():
+                processo.terminate()
+            processo.join()
+
+
+def iterar_linhas_diretorio(arquivos, num_processos=None, tamanho_lote=1000, max_lotes_em_voo=None):
+    for tipo, _, linhas in iterar_lotes_diretorio(arquivos, num_processos, tamanho_lote, max_lotes_em_voo):
+        if tipo == "lote":
+            yield from linhas
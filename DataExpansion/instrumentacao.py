@@ -0,0 +1,235 @@
+import json
+import os
+import threading
+import time
+
+# Instrumentação de baixo custo: cronômetros e contadores nomeados ("db.consulta",
+# "treino.ajuste", ...) agregados num RegistroMetricas em memória e, opcionalmente,
+# enviados como eventos a sinks plugáveis (ex.: SinkJsonLinhas). Sem sinks extras, cada
+# medição custa só dois perf_counter e uma atualização de dicionário sob lock.
+
+
+class RegistroMetricas:
+    # Agregados em memória: contadores somados e, por cronômetro, contagem/total/mínimo/máximo.
+    # Métricas vindas dos workers do pool são somadas aos totais e também guardadas por worker.
+    def __init__(self):
+        self._contadores = {}
+        self._tempos = {}
+        self._workers = {}
+        self._lock = threading.Lock()
+
+    def incrementar(self, nome, valor=1):
+        with self._lock:
+            self._contadores[nome] = self._contadores.get(nome, 0) + valor
+
+    def registrar_tempo(self, nome, segundos):
+        with self._lock:
+            tempo = self._tempos.get(nome)
+            if tempo is None:
+                self._tempos[nome] = [1, segundos, segundos, segundos]
+            else:
+                tempo[0] += 1
+                tempo[1] += segundos
+                tempo[2] = min(tempo[2], segundos)
+                tempo[3] = max(tempo[3], segundos)
+
+    def mesclar(self, instantaneo, origem=None):
+        # Soma um instantaneo() de outro registro (ex.: de um worker) a este
+        with self._lock:
+            for nome, valor in instantaneo.get("contadores", {}).items():
+                self._contadores[nome] = self._contadores.get(nome, 0) + valor
+            for nome, outro in instantaneo.get("tempos", {}).items():
+                tempo = self._tempos.get(nome)
+                if tempo is None:
+                    self._tempos[nome] = [outro["contagem"], outro["total"], outro["minimo"], outro["maximo"]]
+                else:
+                    tempo[0] += outro["contagem"]
+                    tempo[1] += outro["total"]
+                    tempo[2] = min(tempo[2], outro["minimo"])
+                    tempo[3] = max(tempo[3], outro["maximo"])
+            if origem is not None:
+                registro_worker = self._workers.setdefault(origem, RegistroMetricas())
+        if origem is not None:
+            registro_worker.mesclar(instantaneo)
+
+    def instantaneo(self):
+        with self._lock:
+            resultado = {
+                "pid": os.getpid(),
+                "contadores": dict(self._contadores),
+                "tempos": {
+                    nome: {"contagem": contagem, "total": total, "minimo": minimo, "maximo": maximo, "media": total / contagem}
+                    for nome, (contagem, total, minimo, maximo) in self._tempos.items()
+                },
+            }
+            workers = dict(self._workers)
+        if workers:
+            resultado["workers"] = {origem: registro.instantaneo() for origem, registro in workers.items()}
+        return resultado
+
+    def limpar(self):
+        with self._lock:
+            self._contadores.clear()
+            self._tempos.clear()
+            self._workers.clear()
+
+
+class SinkJsonLinhas:
+    # Grava cada evento como uma linha JSON; o arquivo é aberto em modo append, então
+    # vários processos (ex.: workers do pool) podem escrever no mesmo caminho
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._arquivo = open(caminho, "a", encoding="utf-8", buffering=1)
+        self._lock = threading.Lock()
+
+    def emitir(self, evento):
+        linha = json.dumps(evento, default=str) + "\n"
+        with self._lock:
+            self._arquivo.write(linha)
+
+    def fechar(self):
+        with self._lock:
+            self._arquivo.close()
+
+
+class _Cronometro:
+    __slots__ = ("instrumentacao", "nome", "atributos", "inicio")
+
+    def __init__(self, instrumentacao, nome, atributos):
+        self.instrumentacao = instrumentacao
+        self.nome = nome
+        self.atributos = atributos
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo_excecao, excecao, traceback):
+        self.instrumentacao.registrar_tempo(self.nome, time.perf_counter() - self.inicio,
+                                            erro=tipo_excecao is not None, **self.atributos)
+        return False
+
+
+class _CronometroInativo:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo_excecao, excecao, traceback):
+        return False
+
+
+_CRONOMETRO_INATIVO = _CronometroInativo()
+
+
+class Instrumentacao:
+    def __init__(self):
+        self.registro = RegistroMetricas()
+        self.ativo = True
+        self._registros = (self.registro,)  # O global e os abertos por coletar()
+        self._sinks = ()
+        self._lock = threading.Lock()
+
+    def medir(self, nome, **atributos):
+        # Uso: `with instrumentacao.medir("treino.ajuste"):`
+        if not self.ativo:
+            return _CRONOMETRO_INATIVO
+        return _Cronometro(self, nome, atributos)
+
+    def registrar_tempo(self, nome, segundos, **atributos):
+        for registro in self._registros:
+            registro.registrar_tempo(nome, segundos)
+        if self._sinks:
+            self._emitir({"tipo": "tempo", "nome": nome, "segundos": segundos, **atributos})
+
+    def contar(self, nome, valor=1, **atributos):
+        if not self.ativo:
+            return
+        for registro in self._registros:
+            registro.incrementar(nome, valor)
+        if self._sinks:
+            self._emitir({"tipo": "contador", "nome": nome, "valor": valor, **atributos})
+
+    def _emitir(self, evento):
+        evento["timestamp"] = time.time()
+        evento["pid"] = os.getpid()
+        for sink in self._sinks:
+            try:
+                sink.emitir(evento)
+            except Exception as e:
+                print(f"Erro ao emitir métrica para {type(sink).__name__}: {e}")
+
+    def adicionar_sink(self, sink):
+        # Um sink é qualquer objeto com emitir(evento: dict)
+        with self._lock:
+            if sink not in self._sinks:
+                self._sinks = self._sinks + (sink,)
+        return sink
+
+    def remover_sink(self, sink):
+        with self._lock:
+            self._sinks = tuple(s for s in self._sinks if s is not sink)
+
+    def sink_json_linhas(self, caminho):
+        # Reaproveita o sink já registrado para o mesmo arquivo, para que vários treinadores
+        # no mesmo processo não abram (e dupliquem) o arquivo
+        caminho = os.path.abspath(caminho)
+        for sink in self._sinks:
+            if isinstance(sink, SinkJsonLinhas) and sink.caminho == caminho:
+                return sink
+        return self.adicionar_sink(SinkJsonLinhas(caminho))
+
+    def coletar(self):
+        # Context manager que abre um registro só com as métricas do bloco, além do global
+        return _Coleta(self)
+
+    def mesclar(self, instantaneo):
+        # Usado no processo principal para somar as métricas devolvidas por cada worker
+        self.registro.mesclar(instantaneo, origem=f"worker-{instantaneo.get('pid')}")
+
+    def instantaneo(self):
+        return self.registro.instantaneo()
+
+    def limpar(self):
+        self.registro.limpar()
+
+
+class _Coleta:
+    def __init__(self, instrumentacao):
+        self.instrumentacao = instrumentacao
+        self.registro = RegistroMetricas()
+
+    def __enter__(self):
+        with self.instrumentacao._lock:
+            self.instrumentacao._registros = self.instrumentacao._registros + (self.registro,)
+        return self.registro
+
+    def __exit__(self, tipo_excecao, excecao, traceback):
+        with self.instrumentacao._lock:
+            self.instrumentacao._registros = tuple(r for r in self.instrumentacao._registros if r is not self.registro)
+        return False
+
+
+def executar_com_metricas(funcao, *args):
+    # Para tarefas do pool: devolve (resultado, métricas só desta tarefa), que o processo
+    # principal soma com instrumentacao.mesclar
+    with instrumentacao.coletar() as registro:
+        resultado = funcao(*args)
+    return resultado, registro.instantaneo()
+
+
+def formatar_resumo(instantaneo=None):
+    # Tabela de texto com os cronômetros ordenados pelo tempo total
+    instantaneo = instantaneo or instrumentacao.instantaneo()
+    linhas = [f"{'métrica':<32}{'contagem':>10}{'total (s)':>12}{'média (ms)':>12}{'máx (ms)':>12}"]
+    for nome, tempo in sorted(instantaneo["tempos"].items(), key=lambda item: -item[1]["total"]):
+        linhas.append(f"{nome:<32}{tempo['contagem']:>10}{tempo['total']:>12.3f}"
+                      f"{tempo['media'] * 1000:>12.3f}{tempo['maximo'] * 1000:>12.3f}")
+    for nome, valor in sorted(instantaneo["contadores"].items()):
+        linhas.append(f"{nome:<32}{valor:>10}")
+    return "\n".join(linhas)
+
+
+# Instância usada por todo o pacote; cada processo (inclusive os workers) tem a sua
+instrumentacao = Instrumentacao()
@@ -0,0 +1,75 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+
+
+class MonitorRecursos(threading.Thread):
+    # Amostra RSS e CPU do processo e a memória do sistema numa thread em segundo plano.
+    # As amostras ficam num buffer circular e as violações de limite são enviadas para a
+    # fila `eventos` (e para o callback `ao_exceder`, se houver) sem bloquear o treinamento.
+    def __init__(self, intervalo=1.0, memoria_maxima=None, cpu_maximo=None, tamanho_historico=300, ao_exceder=None):
+        super().__init__(name=f"MonitorRecursos-{os.getpid()}", daemon=True)
+        self.intervalo = intervalo
+        self.memoria_maxima = memoria_maxima  # Limite de memória usada no sistema (em bytes)
+        self.cpu_maximo = cpu_maximo  # Limite de uso de CPU do sistema (em porcentagem)
+        self.amostras = deque(maxlen=tamanho_historico)
+        self.eventos = queue.Queue()
+        self.ao_exceder = ao_exceder
+        import psutil  # Só quando um monitor é criado, e não na importação de treining
+
+        self._psutil = psutil
+        self._processo = psutil.Process()
+        self._parar = threading.Event()
+
+    def run(self):
+        # A primeira chamada de cpu_percent(interval=None) só inicializa a medição
+        self._processo.cpu_percent(interval=None)
+        self._psutil.cpu_percent(interval=None)
+        while not self._parar.wait(self.intervalo):
+            amostra = self.amostrar()
+            self.amostras.append(amostra)
+            self._verificar_limites(amostra)
+
+    def amostrar(self):
+        memoria_sistema = self._psutil.virtual_memory()
+        return {
+            "timestamp": time.time(),
+            "rss": self._processo.memory_info().rss,
+            "cpu_processo": self._processo.cpu_percent(interval=None),
+            "cpu_sistema": self._psutil.cpu_percent(interval=None),
+            "memoria_usada": memoria_sistema.used,
+            "memoria_disponivel": memoria_sistema.available,
+        }
+
+    def _verificar_limites(self, amostra):
+        if self.memoria_maxima and amostra["memoria_usada"] > self.memoria_maxima:
+            self._notificar({"tipo": "memory_error", "valor": amostra["memoria_usada"], "limite": self.memoria_maxima, "amostra": amostra})
+        if self.cpu_maximo and amostra["cpu_sistema"] > self.cpu_maximo:
+            self._notificar({"tipo": "cpu_error", "valor": amostra["cpu_sistema"], "limite": self.cpu_maximo, "amostra": amostra})
+
+    def _notificar(self, evento):
+        self.eventos.put(evento)
+        if self.ao_exceder:
+            try:
+                self.ao_exceder(evento)
+            except Exception as e:
+                print(f"Erro no callback do monitor de recursos: {e}")
+
+    def ultima_amostra(self):
+        return self.amostras[-1] if self.amostras else None
+
+    def eventos_pendentes(self):
+        eventos = []
+        while True:
+            try:
+                eventos.append(self.eventos.get_nowait())
+            except queue.Empty:
+                return eventos
+
+    def parar(self):
+        self._parar.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join()
@@ -0,0 +1,95 @@
+import queue
+import threading
+
+import numpy as np
+
+_FIM = object()
+
+
+class _ErroProdutor:
+    def __init__(self, erro):
+        self.erro = erro
+
+
+def linhas_para_arrays(linhas, num_features, dtype=np.float32, dtype_labels=None):
+    # Converte um lote de tuplas (features..., label) do DatabaseManager em (x, y)
+    lote = np.asarray(linhas, dtype=dtype)
+    y = lote[:, num_features]
+    return lote[:, :num_features], (y.astype(dtype_labels) if dtype_labels is not None else y)
+
+
+class PrefetchLotes:
+    # Consome `fonte` (ex.: db_manager.carregar_dados_em_lotes) numa thread em segundo plano,
+    # aplica `transformar` a cada lote e mantém até `prefetch` lotes prontos numa fila.
+    # Enquanto o modelo treina no lote atual, os próximos já estão sendo lidos e pré-processados.
+    # Erros da thread produtora são relançados na iteração.
+    def __init__(self, fonte, transformar=None, prefetch=2):
+        self._fila = queue.Queue(maxsize=max(1, prefetch))
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._produzir, args=(fonte, transformar), name="PrefetchLotes", daemon=True)
+        self._thread.start()
+
+    def _produzir(self, fonte, transformar):
+        try:
+            for item in fonte:
+                if transformar is not None:
+                    item = transformar(item)
+                if not self._colocar(item):
+                    return
+            self._colocar(_FIM)
+        except BaseException as e:
+            self._colocar(_ErroProdutor(e))
+        finally:
+            # Fecha o gerador na mesma thread que o consumiu, devolvendo a conexão ao pool
+            if hasattr(fonte, "close"):
+                fonte.close()
+
+    def _colocar(self, item):
+        while not self._parar.is_set():
+            try:
+                self._fila.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def __iter__(self):
+        while True:
+            item = self._fila.get()
+            if item is _FIM:
+                return
+            if isinstance(item, _ErroProdutor):
+                raise item.erro
+            yield item
+
+    def fechar(self):
+        self._parar.set()
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+
+def fonte_banco(db_manager, nome_tabela, colunas_features, coluna_label, where=None, tamanho_lote=None):
+    # Função que devolve, a cada chamada, um novo iterador de lotes (x, y) lidos do banco;
+    # permite várias passadas (ex.: ajustar o scaler e depois treinar por várias épocas)
+    colunas = ', '.join(list(colunas_features) + [coluna_label])
+
+    def fonte():
+        for linhas in db_manager.carregar_dados_em_lotes(nome_tabela, colunas, where, tamanho_lote):
+            yield linhas_para_arrays(linhas, len(colunas_features))
+    return fonte
+
+
+def fonte_arquivo(filepath, colunas_features, coluna_label, tamanho_lote=1000):
+    # Como fonte_banco, mas lendo um arquivo CSV/JSON/JSONL/YAML em streaming
+    from DataExpansion.ingestao import ler_arquivo_em_lotes
+
+    def fonte():
+        for lote in ler_arquivo_em_lotes(filepath, tamanho_lote):
+            linhas = [tuple(item[coluna] for coluna in colunas_features) + (item[coluna_label],) for item in lote]
+            yield linhas_para_arrays(linhas, len(colunas_features))
+    return fonte
@@ -0,0 +1,273 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class PoolConexoes:
+    # Pool de conexões thread-safe e independente de driver. As conexões são criadas sob
+    # demanda até `tamanho`; quem pede uma conexão com o pool cheio espera até `timeout`.
+    # Conexões ociosas por mais de `max_ocioso` segundos são recicladas e as ociosas por
+    # mais de `verificar_apos` segundos passam por `verificar_conexao` antes de sair do pool.
+    def __init__(self, criar_conexao, tamanho=3, verificar_conexao=None, max_ocioso=300.0, verificar_apos=30.0, timeout=30.0):
+        self.criar_conexao = criar_conexao
+        self.tamanho = tamanho
+        self.verificar_conexao = verificar_conexao
+        self.max_ocioso = max_ocioso
+        self.verificar_apos = verificar_apos
+        self.timeout = timeout
+        self._livres = deque()  # (conexão, instante em que voltou ao pool)
+        self._total = 0
+        self._fechado = False
+        self._condicao = threading.Condition()
+        self._metricas = {
+            "checkouts": 0,
+            "criadas": 0,
+            "recicladas": 0,
+            "descartadas": 0,
+            "esperas": 0,
+            "tempo_espera_total": 0.0,
+            "tempo_espera_max": 0.0,
+        }
+
+    def obter(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        inicio = time.perf_counter()
+        with self._condicao:
+            while not self._livres and self._total >= self.tamanho:
+                if self._fechado:
+                    raise RuntimeError("O pool de conexões foi fechado.")
+                restante = timeout - (time.perf_counter() - inicio)
+                if restante <= 0 or not self._condicao.wait(restante):
+                    raise TimeoutError(f"Nenhuma conexão livre no pool após {timeout:.1f}s (tamanho={self.tamanho}).")
+            if self._fechado:
+                raise RuntimeError("O pool de conexões foi fechado.")
+            if self._livres:
+                conn, devolvida_em = self._livres.pop()  # LIFO: reaproveita a conexão mais recente
+            else:
+                conn, devolvida_em = None, None
+                self._total += 1  # Reserva a vaga; a conexão é criada fora do lock
+            espera = time.perf_counter() - inicio
+            self._metricas["checkouts"] += 1
+            self._metricas["tempo_espera_total"] += espera
+            self._metricas["tempo_espera_max"] = max(self._metricas["tempo_espera_max"], espera)
+            if espera > 0.001:
+                self._metricas["esperas"] += 1
+        if conn is None:
+            return self._nova_conexao()
+        return self._preparar(conn, devolvida_em)
+
+    def _preparar(self, conn, devolvida_em):
+        ocioso = time.monotonic() - devolvida_em
+        if self.max_ocioso and ocioso > self.max_ocioso:
+            self._fechar(conn)
+            self._contar("recicladas")
+            return self._nova_conexao()
+        if self.verificar_conexao and ocioso > self.verificar_apos:
+            try:
+                self.verificar_conexao(conn)
+            except Exception:
+                self._fechar(conn)
+                self._contar("descartadas")
+                return self._nova_conexao()
+        return conn
+
+    def _nova_conexao(self):
+        # A vaga já foi reservada em obter(); se a criação falhar ela é devolvida
+        try:
+            conn = self.criar_conexao()
+        except Exception:
+            with self._condicao:
+                self._total -= 1
+                self._condicao.notify()
+            raise
+        self._contar("criadas")
+        return conn
+
+    def devolver(self, conn, descartar=False):
+        with self._condicao:
+            if descartar or self._fechado:
+                self._total -= 1
+                if descartar:
+                    self._metricas["descartadas"] += 1
+            else:
+                self._livres.append((conn, time.monotonic()))
+                conn = None
+            self._condicao.notify()
+        if conn is not None:
+            self._fechar(conn)
+
+    @contextmanager
+    def conexao(self, timeout=None):
+        conn = self.obter(timeout)
+        try:
+            yield conn
+        finally:
+            self.devolver(conn)
+
+    def fechar_todas(self):
+        with self._condicao:
+            self._fechado = True
+            livres = list(self._livres)
+            self._livres.clear()
+            self._total -= len(livres)
+            self._condicao.notify_all()
+        for conn, _ in livres:
+            self._fechar(conn)
+
+    def metricas(self):
+        with self._condicao:
+            metricas = dict(self._metricas)
+            metricas["tamanho"] = self.tamanho
+            metricas["livres"] = len(self._livres)
+            metricas["em_uso"] = self._total - len(self._livres)
+        checkouts = metricas["checkouts"]
+        metricas["tempo_espera_medio"] = metricas["tempo_espera_total"] / checkouts if checkouts else 0.0
+        return metricas
+
+    def _contar(self, nome):
+        with self._condicao:
+            self._metricas[nome] += 1
+
+    @staticmethod
+    def _fechar(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+class PoolConexoesAsync:
+    # Versão asyncio do PoolConexoes para drivers com API async nativa (mysql.connector.aio):
+    # criar_conexao, verificar_conexao e o close() das conexões são corrotinas, e quem espera
+    # por uma conexão livre libera o event loop. Mesmas regras de tamanho, ociosidade e métricas.
+    def __init__(self, criar_conexao, tamanho=3, verificar_conexao=None, max_ocioso=300.0, verificar_apos=30.0, timeout=30.0):
+        self.criar_conexao = criar_conexao
+        self.tamanho = tamanho
+        self.verificar_conexao = verificar_conexao
+        self.max_ocioso = max_ocioso
+        self.verificar_apos = verificar_apos
+        self.timeout = timeout
+        self._livres = deque()  # (conexão, instante em que voltou ao pool)
+        self._total = 0
+        self._fechado = False
+        self._condicao = None  # Criada no primeiro uso, dentro do event loop
+        self._metricas = {
+            "checkouts": 0,
+            "criadas": 0,
+            "recicladas": 0,
+            "descartadas": 0,
+            "esperas": 0,
+            "tempo_espera_total": 0.0,
+            "tempo_espera_max": 0.0,
+        }
+
+    def _obter_condicao(self):
+        if self._condicao is None:
+            import asyncio
+
+            self._condicao = asyncio.Condition()
+        return self._condicao
+
+    async def obter(self, timeout=None):
+        import asyncio
+
+        timeout = self.timeout if timeout is None else timeout
+        inicio = time.perf_counter()
+        condicao = self._obter_condicao()
+        async with condicao:
+            while not self._livres and self._total >= self.tamanho:
+                if self._fechado:
+                    raise RuntimeError("O pool de conexões foi fechado.")
+                restante = timeout - (time.perf_counter() - inicio)
+                try:
+                    if restante <= 0:
+                        raise asyncio.TimeoutError
+                    await asyncio.wait_for(condicao.wait(), restante)
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"Nenhuma conexão livre no pool após {timeout:.1f}s (tamanho={self.tamanho}).") from None
+            if self._fechado:
+                raise RuntimeError("O pool de conexões foi fechado.")
+            if self._livres:
+                conn, devolvida_em = self._livres.pop()  # LIFO: reaproveita a conexão mais recente
+            else:
+                conn, devolvida_em = None, None
+                self._total += 1  # Reserva a vaga; a conexão é criada fora do lock
+            espera = time.perf_counter() - inicio
+            self._metricas["checkouts"] += 1
+            self._metricas["tempo_espera_total"] += espera
+            self._metricas["tempo_espera_max"] = max(self._metricas["tempo_espera_max"], espera)
+            if espera > 0.001:
+                self._metricas["esperas"] += 1
+        if conn is None:
+            return await self._nova_conexao()
+        return await self._preparar(conn, devolvida_em)
+
+    async def _preparar(self, conn, devolvida_em):
+        ocioso = time.monotonic() - devolvida_em
+        if self.max_ocioso and ocioso > self.max_ocioso:
+            await self._fechar(conn)
+            self._metricas["recicladas"] += 1
+            return await self._nova_conexao()
+        if self.verificar_conexao and ocioso > self.verificar_apos:
+            try:
+                await self.verificar_conexao(conn)
+            except Exception:
+                await self._fechar(conn)
+                self._metricas["descartadas"] += 1
+                return await self._nova_conexao()
+        return conn
+
+    async def _nova_conexao(self):
+        # A vaga já foi reservada em obter(); se a criação falhar ela é devolvida
+        try:
+            conn = await self.criar_conexao()
+        except BaseException:
+            condicao = self._obter_condicao()
+            async with condicao:
+                self._total -= 1
+                condicao.notify()
+            raise
+        self._metricas["criadas"] += 1
+        return conn
+
+    async def devolver(self, conn, descartar=False):
+        condicao = self._obter_condicao()
+        async with condicao:
+            if descartar or self._fechado:
+                self._total -= 1
+                if descartar:
+                    self._metricas["descartadas"] += 1
+            else:
+                self._livres.append((conn, time.monotonic()))
+                conn = None
+            condicao.notify()
+        if conn is not None:
+            await self._fechar(conn)
+
+    async def fechar_todas(self):
+        condicao = self._obter_condicao()
+        async with condicao:
+            self._fechado = True
+            livres = list(self._livres)
+            self._livres.clear()
+            self._total -= len(livres)
+            condicao.notify_all()
+        for conn, _ in livres:
+            await self._fechar(conn)
+
+    def metricas(self):
+        metricas = dict(self._metricas)
+        metricas["tamanho"] = self.tamanho
+        metricas["livres"] = len(self._livres)
+        metricas["em_uso"] = self._total - len(self._livres)
+        checkouts = metricas["checkouts"]
+        metricas["tempo_espera_medio"] = metricas["tempo_espera_total"] / checkouts if checkouts else 0.0
+        return metricas
+
+    @staticmethod
+    async def _fechar(conn):
+        try:
+            await conn.close()
+        except Exception:
+            pass
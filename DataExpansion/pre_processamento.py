@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+VERSAO = 1  # Incrementar quando o formato do pré-processamento mudar, invalidando o cache em disco
+
+
+def normalizar(x, divisor=255.0, saida=None):
+    # x / divisor gravado direto num buffer float32 pré-alocado: uma única alocação do
+    # tamanho do dataset, sem o array intermediário do astype. Com saida=x (float32 gravável)
+    # a normalização é feita no próprio array.
+    if saida is None:
+        saida = np.empty(x.shape, dtype=np.float32)
+    np.divide(x, np.float32(divisor), out=saida, casting='unsafe')
+    return saida
+
+
+def labels_inteiros(y):
+    # Labels esparsos (um inteiro por amostra) para sparse_categorical_crossentropy, em vez
+    # de uma matriz one-hot densa com num_classes colunas
+    y = np.asarray(y)
+    if y.ndim == 2 and y.shape[1] == 1:
+        y = y.reshape(-1)
+    return y.astype(np.int32, copy=False)
+
+
+def impressao_dados(*arrays, parametros=None, tamanho_bloco=1 << 24):
+    # Hash do conteúdo (lido em blocos, sem copiar os arrays), formato e dtype dos arrays,
+    # mais os parâmetros do pré-processamento
+    impressao = hashlib.blake2b(digest_size=16)
+    impressao.update(json.dumps([VERSAO, parametros], sort_keys=True, default=str).encode())
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        impressao.update(f"{array.dtype.str}{array.shape}".encode())
+        bytes_array = memoryview(array.reshape(-1)).cast('B')
+        for inicio in range(0, len(bytes_array), tamanho_bloco):
+            impressao.update(bytes_array[inicio:inicio + tamanho_bloco])
+    return impressao.hexdigest()
+
+
+class CachePreProcessamento:
+    # Arrays pré-processados em diretorio/<impressão>/<nome>.npy, reabertos com mmap_mode='r':
+    # execuções seguintes e os workers do pool carregam o resultado sem refazer o trabalho
+    # e compartilham as mesmas páginas do cache do sistema operacional.
+    # Com tamanho_maximo (bytes), as entradas usadas há mais tempo são apagadas a cada gravação
+    # até o diretório caber no limite; sem ele o cache só cresce e limpar() apaga tudo.
+    def __init__(self, diretorio, tamanho_maximo=None):
+        self.diretorio = diretorio
+        self.tamanho_maximo = tamanho_maximo
+
+    def obter(self, impressao, calcular, nomes=("x", "y")):
+        caminhos = self.obter_caminhos(impressao, calcular, nomes)
+        return tuple(np.load(caminhos[nome], mmap_mode='r') for nome in nomes)
+
+    def obter_caminhos(self, impressao, calcular, nomes=("x", "y")):
+        # Como obter, mas devolve {nome: caminho do .npy} para publicar os arquivos sem copiá-los
+        caminho = os.path.join(self.diretorio, impressao)
+        if os.path.isdir(caminho):
+            os.utime(caminho)  # Marca a entrada como usada recentemente
+        else:
+            self._gravar(caminho, calcular(), nomes)
+            self._podar(caminho)
+        return {nome: os.path.join(caminho, f"{nome}.npy") for nome in nomes}
+
+    def _gravar(self, caminho, arrays, nomes):
+        os.makedirs(self.diretorio, exist_ok=True)
+        # Grava num diretório temporário e renomeia: um leitor nunca vê uma entrada pela metade
+        temporario = tempfile.mkdtemp(prefix=".gravando_", dir=self.diretorio)
+        try:
+            for nome, array in zip(nomes, arrays):
+                np.save(os.path.join(temporario, f"{nome}.npy"), array)
+            os.replace(temporario, caminho)
+        except OSError:
+            if not os.path.isdir(caminho):
+                raise
+            # Outro processo gravou a mesma entrada primeiro
+        finally:
+            shutil.rmtree(temporario, ignore_errors=True)
+
+    def _podar(self, manter):
+        # Apaga as entradas menos usadas recentemente (pelo mtime do diretório) até caber em
+        # tamanho_maximo; a entrada recém-gravada nunca é apagada, mesmo que sozinha passe do limite
+        if not self.tamanho_maximo:
+            return
+        entradas = []
+        for entrada in os.scandir(self.diretorio):
+            if entrada.name.startswith(".") or not entrada.is_dir():
+                continue
+            tamanho = sum(arquivo.stat().st_size for arquivo in os.scandir(entrada.path) if arquivo.is_file())
+            entradas.append((entrada.stat().st_mtime, entrada.path, tamanho))
+        total = sum(tamanho for _, _, tamanho in entradas)
+        for _, caminho, tamanho in sorted(entradas):
+            if total <= self.tamanho_maximo:
+                break
+            if caminho == manter:
+                continue
+            shutil.rmtree(caminho, ignore_errors=True)
+            total -= tamanho
+
+    def limpar(self):
+        # Apaga o cache inteiro; os arrays já abertos com mmap continuam válidos no Linux e no macOS
+        shutil.rmtree(self.diretorio, ignore_errors=True)
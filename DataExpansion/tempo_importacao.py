@@ -0,0 +1,42 @@
+import subprocess
+import sys
+
+# Tempo máximo aceitável para importar cada módulo abaixo em um processo novo
+ORCAMENTO_SEGUNDOS = 0.1
+
+# Módulos com orçamento e o que já vem carregado antes de medir: numpy é dependência
+# obrigatória (~0.1 s sozinho) e não entra na conta; TensorFlow e scikit-learn entram, e
+# por isso só podem ser importados quando um treinador é criado
+MODULOS_ORCADOS = {
+    "DataExpansion": (),
+    "DataExpansion.DatabaseManager": ("numpy",),
+    "DataExpansion.treining": ("numpy",),
+}
+
+
+def medir_tempo_importacao(modulo="DataExpansion", repeticoes=5, pre_carregados=()):
+    # Cada medição roda num interpretador novo, para que módulos já carregados não mascarem o custo
+    codigo = "".join(f"import {nome}; " for nome in pre_carregados)
+    codigo += f"import time; inicio = time.perf_counter(); import {modulo}; print(time.perf_counter() - inicio)"
+    tempos = []
+    for _ in range(repeticoes):
+        resultado = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True)
+        tempos.append(float(resultado.stdout))
+    return min(tempos)
+
+
+def verificar_orcamentos(repeticoes=5):
+    # {módulo: {"segundos", "orcamento", "dentro_do_orcamento"}} para cada módulo de MODULOS_ORCADOS
+    resultados = {}
+    for modulo, pre_carregados in MODULOS_ORCADOS.items():
+        segundos = medir_tempo_importacao(modulo, repeticoes, pre_carregados)
+        resultados[modulo] = {"segundos": segundos, "orcamento": ORCAMENTO_SEGUNDOS,
+                              "dentro_do_orcamento": segundos <= ORCAMENTO_SEGUNDOS}
+    return resultados
+
+
+if __name__ == "__main__":
+    resultados = verificar_orcamentos()
+    for modulo, resultado in resultados.items():
+        print(f"import {modulo}: {resultado['segundos'] * 1000:.1f} ms (orçamento: {ORCAMENTO_SEGUNDOS * 1000:.0f} ms)")
+    sys.exit(0 if all(resultado["dentro_do_orcamento"] for resultado in resultados.values()) else 1)
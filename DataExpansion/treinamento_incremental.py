@@ -0,0 +1,73 @@
+from collections import deque
+
+import numpy as np
+
+from DataExpansion.instrumentacao import instrumentacao, executar_com_metricas
+
+
+def treinar_subfloresta(classe, parametros, x, y, semente):
+    # Executado nos workers: treina uma floresta pequena só com o bloco recebido
+    parametros = dict(parametros)
+    if parametros.get("random_state") is None:
+        parametros["random_state"] = semente
+    else:
+        parametros["random_state"] += semente
+    with instrumentacao.medir("treino.ajuste"):
+        return classe(**parametros).fit(x, y)
+
+
+def treinar_florestas_por_bloco(pool, fonte, classe, parametros, max_em_voo):
+    # Envia cada bloco a um worker assim que é lido, mantendo no máximo max_em_voo blocos
+    # pendentes; apply_async é usado porque pool.imap consumiria toda a fonte de uma vez
+    florestas = []
+    pendentes = deque()
+
+    def receber():
+        floresta, metricas = pendentes.popleft().get()
+        instrumentacao.mesclar(metricas)
+        florestas.append(floresta)
+
+    for semente, (x, y) in enumerate(fonte):
+        pendentes.append(pool.apply_async(executar_com_metricas, (treinar_subfloresta, classe, parametros, x, y, semente)))
+        if len(pendentes) >= max_em_voo:
+            receber()
+    while pendentes:
+        receber()
+    return florestas
+
+
+def combinar_florestas(florestas):
+    # Junta as árvores de todas as subflorestas num único estimador. Se algum bloco não viu
+    # todas as classes, as árvores não são compatíveis entre si e o resultado é uma
+    # FlorestaCombinada, que alinha as probabilidades pelas classes de cada subfloresta.
+    if not florestas:
+        raise ValueError("Nenhum bloco de dados foi recebido para treinar as florestas.")
+    with instrumentacao.medir("treino.combinacao_pesos"):
+        return _combinar_florestas(florestas)
+
+
+def _combinar_florestas(florestas):
+    base = florestas[0]
+    if all(np.array_equal(floresta.classes_, base.classes_) for floresta in florestas):
+        base.estimators_ = [arvore for floresta in florestas for arvore in floresta.estimators_]
+        base.n_estimators = len(base.estimators_)
+        return base
+    return FlorestaCombinada(florestas)
+
+
+class FlorestaCombinada:
+    def __init__(self, florestas):
+        self.florestas = florestas
+        self.classes_ = np.unique(np.concatenate([floresta.classes_ for floresta in florestas]))
+        self.n_estimators = sum(len(floresta.estimators_) for floresta in florestas)
+
+    def predict_proba(self, x):
+        probabilidades = np.zeros((len(x), len(self.classes_)))
+        for floresta in self.florestas:
+            # Média ponderada pelo número de árvores, como numa única floresta
+            colunas = np.searchsorted(self.classes_, floresta.classes_)
+            probabilidades[:, colunas] += floresta.predict_proba(x) * len(floresta.estimators_)
+        return probabilidades / self.n_estimators
+
+    def predict(self, x):
+        return self.classes_[np.argmax(self.predict_proba(x), axis=1)]
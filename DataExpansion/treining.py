@@ -2,24 +2,47 @@ import numpy as np
 import os
 import logging
 from datetime import datetime
-from sklearn.model_selection import train_test_split
 from abc import ABC, abstractmethod
 import multiprocessing
-import psutil
 import gc
-from errorhandler import ErrorHandler
-import joblib
-from joblib import dump
+import itertools
+import queue
+import time
+from DataExpansion.errorhandler import ErrorHandler
+from DataExpansion.dados_compartilhados import DadosCompartilhados
+from DataExpansion.monitor_recursos import MonitorRecursos
+from DataExpansion.controlador_recursos import ControladorRecursos
+from DataExpansion.pipeline_dados import PrefetchLotes, linhas_para_arrays
+from DataExpansion.checkpoints import ArmazemCheckpoints
+from DataExpansion.instrumentacao import instrumentacao, executar_com_metricas
+from DataExpansion.pre_processamento import CachePreProcessamento, impressao_dados, labels_inteiros, normalizar
+
+# TensorFlow e scikit-learn são carregados por importar_bibliotecas_e_dados_necessarios
+# quando um treinador é criado, e não na importação deste módulo
+train_test_split = None
+accuracy_score = None
 
 class TreinadorIA(ABC):
-    def __init__(self, db_manager, diretorio_temporario, num_iteracoes=10, memoria_maxima=None, cpu_maximo=None, **kwargs):
+    def __init__(self, db_manager, diretorio_temporario, num_iteracoes=10, memoria_maxima=None, cpu_maximo=None, metodo_inicio="spawn", **kwargs):
         self.db_manager = db_manager
         self.diretorio_temporario = diretorio_temporario
         self.num_iteracoes = num_iteracoes
         self.memoria_maxima = memoria_maxima  # Limite máximo de memória (em bytes)
         self.cpu_maximo = cpu_maximo  # Limite máximo de uso de CPU (em porcentagem)
+        self.metodo_inicio = metodo_inicio  # spawn/forkserver evitam herdar o estado do TensorFlow via fork
         self.kwargs = kwargs
+        self.monitor = None
+        self.checkpoints = ArmazemCheckpoints(diretorio_temporario, kwargs.get('compressao_checkpoint', 0), kwargs.get('manter_checkpoints'))
+        self.controlador = ControladorRecursos(memoria_maxima, cpu_maximo, batch_inicial=kwargs.get('batch_size', 32))
+        self._pool = None
+        self._tamanho_pool = 0
+        self._barreira_pool = None
+        self._epocas_concluidas = 0  # Para retomar o fit após um recuo por falta de memória
         self.logger = None  # Para configurar logging posteriormente
+        if kwargs.get('arquivo_metricas'):
+            # Eventos de tempo/contador em JSON lines; vai na especificação, então os workers também gravam
+            instrumentacao.sink_json_linhas(kwargs['arquivo_metricas'])
+        self.importar_bibliotecas_e_dados_necessarios()
         self.modelo = self.criar_modelo()
         self.error_handler = ErrorHandler()  # Instancia o ErrorHandler
 
@@ -32,19 +55,29 @@ class TreinadorIA(ABC):
         pass
 
     @abstractmethod
-    def combinar_pesos(self, instancias_modelos):
+    def combinar_pesos(self, instancias_modelos, ponderar_por_precisao=False):
+        pass
+
+    @abstractmethod
+    def salvar_melhor_pesos(self, modelo, instancia=None, rodada=None):
         pass
 
     @abstractmethod
-    def salvar_melhor_pesos(self, modelo):
+    def carregar_melhor_pesos(self, caminho, mmap=False):
         pass
 
     def configurar_logging(self, nome_logger):
         logger = logging.getLogger(nome_logger)
+        if logger.handlers:
+            # Já configurado neste processo (ex.: worker do pool reaproveitado entre rodadas):
+            # reutiliza os handlers em vez de duplicar as mensagens e abrir outro arquivo
+            self.logger = logger
+            return
         logger.setLevel(logging.INFO)
+        logger.propagate = False
         handler_console = logging.StreamHandler()
         handler_console.setLevel(logging.INFO)
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levellevel)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
         handler_console.setFormatter(formatter)
         logger.addHandler(handler_console)
         log_filename = datetime.now().strftime(f'{nome_logger}_%Y%m%d_%H%M%S.log')
@@ -56,59 +89,337 @@ class TreinadorIA(ABC):
         self.logger = logger
         print(f"Logs de treinamento serão salvos em: {log_filepath}")
 
-    def monitorar_recursos(self):
+    def monitorar_recursos(self, intervalo=1.0):
+        # Não bloqueia: a amostragem roda na thread do MonitorRecursos, que avisa
+        # ao_exceder_limite quando memoria_maxima ou cpu_maximo são ultrapassados
+        if self.monitor is None:
+            self.monitor = MonitorRecursos(intervalo, self.memoria_maxima, self.cpu_maximo, ao_exceder=self.ao_exceder_limite)
+            self.monitor.start()
+        return self.monitor
+
+    def parar_monitor(self):
+        if self.monitor is not None:
+            self.monitor.parar()
+            self.monitor = None
+
+    def ao_exceder_limite(self, evento):
+        # Executado na thread do monitor: só registra e libera lixo; quem treina consome
+        # self.monitor.eventos_pendentes() e decide se pausa, reduz o lote ou para
+        mensagem = self.error_handler.get_message(evento["tipo"])
+        if self.logger:
+            self.logger.warning(mensagem)
+        else:
+            print(mensagem)
+        if evento["tipo"] == 'memory_error':
+            gc.collect()
+
+    def verificar_limites(self):
+        # Consome as violações acumuladas pelo monitor durante o treinamento: cpu_error pausa
+        # por kwargs['pausa_cpu'] segundos (padrão: um intervalo do monitor) e memory_error
+        # devolve True, para quem chama reduzir o lote ou parar
+        if self.monitor is None:
+            return False
+        tipos = {evento["tipo"] for evento in self.monitor.eventos_pendentes()}
+        if 'cpu_error' in tipos:
+            time.sleep(self.kwargs.get('pausa_cpu', self.monitor.intervalo))
+        return 'memory_error' in tipos
+
+    def _ajustar_passo(self, passo, tamanho_lote):
+        # Entre lotes: depois de uma falta de memória os lotes seguintes são ajustados em
+        # partes com metade do tamanho, até batch_minimo; abaixo disso o treinamento para
+        if not self.verificar_limites():
+            return passo
+        passo = (passo or tamanho_lote) // 2
+        if passo < self.controlador.batch_minimo:
+            raise MemoryError("Limite de memória excedido mesmo com o menor lote; treinamento interrompido.")
+        print(f"Limite de memória excedido; os próximos lotes serão ajustados em partes de {passo} linhas")
+        return passo
+
+    @staticmethod
+    def _partes(x, y, passo):
+        passo = passo or len(x)
+        for inicio in range(0, len(x), passo):
+            yield x[inicio:inicio + passo], y[inicio:inicio + passo]
+
+    def especificacao(self):
+        # Descrição serializável do treinador: os workers a recebem no lugar de self,
+        # sem db_manager, modelo compilado ou pool
+        kwargs = dict(self.kwargs, memoria_maxima=self.memoria_maxima, cpu_maximo=self.cpu_maximo)
+        return self.__class__, (self.diretorio_temporario, self.num_iteracoes), kwargs
+
+    @classmethod
+    def a_partir_da_especificacao(cls, especificacao):
+        classe, args, kwargs = especificacao
+        return classe(None, *args, **kwargs)
+
+    def _obter_pool(self, num_processos):
+        # O pool é mantido entre rodadas de treinamento e só é recriado se precisar crescer.
+        # Cada worker importa TensorFlow/scikit-learn ao iniciar, e não na primeira tarefa.
+        if self._pool is None or num_processos > self._tamanho_pool:
+            self.encerrar_pool()
+            contexto = multiprocessing.get_context(self.metodo_inicio)
+            self._barreira_pool = contexto.Barrier(num_processos)
+            self._pool = contexto.Pool(processes=num_processos, initializer=_inicializar_worker,
+                                       initargs=(self.__class__, self._barreira_pool))
+            self._tamanho_pool = num_processos
+        return self._pool
+
+    def aquecer_pool(self, num_processos, timeout=600):
+        # Cria o pool e espera todos os workers terminarem o initializer: cada tarefa de
+        # sincronização fica presa na barreira até as outras chegarem, então cada worker
+        # recebe exatamente uma. Útil antes de medir tempos de treinamento.
+        pool = self._obter_pool(num_processos)
+        pool.map(_sincronizar_worker, [timeout] * self._tamanho_pool, chunksize=1)
+        return pool
+
+    def encerrar_pool(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+            self._tamanho_pool = 0
+
+    def exportar_modelo(self, modelo):
+        # O que o worker devolve ao processo principal; subclasses podem enviar só os pesos
+        return modelo
+
+    def preparar_split(self, dados, semente=42):
+        # Pré-processa e separa treino/teste uma única vez no processo principal e publica os
+        # quatro arrays para os workers via mmap. Se cada worker fizesse o split, o fancy
+        # indexing do train_test_split criaria nele uma cópia privada do dataset inteiro.
+        with instrumentacao.medir("treino.pre_processamento"):
+            x, y = self.pre_processar_dados(dados)
+            x_treino, x_teste, y_treino, y_teste = train_test_split(x, y, test_size=0.2, random_state=semente)
+        return DadosCompartilhados({"x_treino": x_treino, "y_treino": y_treino, "x_teste": x_teste, "y_teste": y_teste},
+                                   self.diretorio_temporario)
+
+    def treinar_multiplas_instancias(self, dados, num_instancias, num_processos=None):
+        return list(self._executar_instancias(dados, num_instancias, num_processos=num_processos))
+
+    def treinar_e_combinar(self, dados, num_instancias, ponderar_por_precisao=False, num_processos=None):
+        # Cada resultado é combinado assim que seu worker termina, sem acumular os N modelos
+        resultados = self._executar_instancias(dados, num_instancias, ordenado=False, num_processos=num_processos)
+        return self.combinar_pesos(resultados, ponderar_por_precisao=ponderar_por_precisao)
+
+    def _executar_instancias(self, dados, num_instancias, ordenado=True, num_processos=None):
+        # Os arrays são publicados uma vez em disco e cada worker os abre com mmap,
+        # em vez de receber uma cópia serializada do dataset inteiro
+        compartilhados = dados if isinstance(dados, DadosCompartilhados) else self.preparar_split(dados)
+        especificacao = self.especificacao()
+        tarefas = [(especificacao, compartilhados, i) for i in range(num_instancias)]
         try:
-            if self.memoria_maxima and psutil.virtual_memory().used > self.memoria_maxima:
-                raise MemoryError("O uso de memória excedeu o limite máximo permitido.")
-            if self.cpu_maximo and psutil.cpu_percent(interval=1) > self.cpu_maximo:
-                raise RuntimeError("O uso de CPU excedeu o limite máximo permitido.")
-        except MemoryError as e:
-            self.error_handler.handle_error('memory_error', str(e), 'memória')
-        except RuntimeError as e:
-            self.error_handler.handle_error('cpu_error', str(e), 'CPU')
-
-    def treinar_multiplas_instancias(self, dados, num_instancias):
-        with multiprocessing.Pool(processes=num_instancias) as pool:
-            resultados = pool.starmap(self._treinar_instancia, [(dados, i) for i in range(num_instancias)])
-        return resultados
-
-    def _treinar_instancia(self, dados, i):
-        print(f"Treinando instância {i+1}")
-        modelo_instancia = self.criar_modelo()  # Cria uma nova instância do modelo
-        treinador_instancia = self.__class__(self.db_manager, self.diretorio_temporario, self.num_iteracoes, self.memoria_maxima, self.cpu_maximo, **self.kwargs)
-        treinador_instancia.configurar_logging(f'instancia_{i+1}')
-        treinador_instancia.monitorar_recursos()  # Monitorar recursos antes de treinar
-        modelo_instancia, precisao = treinador_instancia.treinar_modelo(dados, iteracao=i)
-        return modelo_instancia, precisao
+            # Menos instâncias simultâneas quando a memória ou cpu_maximo não comportam todas;
+            # o limite vale mesmo se o pool já tiver mais workers de uma rodada anterior
+            limite = self.controlador.estimar_instancias(num_processos or num_instancias, self.kwargs.get('memoria_por_instancia'))
+            pool = self._obter_pool(limite)
+            for resultado, metricas in mapear_com_limite(pool, _executar_tarefa, tarefas, limite, ordenado):
+                # Métricas de cada worker somadas ao registro deste processo
+                instrumentacao.mesclar(metricas)
+                yield resultado
+        finally:
+            if compartilhados is not dados:
+                compartilhados.liberar()
+
+    def ajustar_modelo(self, x, y, batch_size):
+        self.modelo.fit(x, y, epochs=self.num_iteracoes, batch_size=batch_size)
+
+    def pre_processar_lote(self, x, y):
+        # Pré-processamento aplicado a cada lote de treinar_em_lotes; por padrão, o mesmo do dataset inteiro
+        return self.pre_processar_dados({"features": x, "labels": y})
+
+    def ajustar_lote(self, x, y):
+        raise NotImplementedError(f"{self.__class__.__name__} não suporta treinamento em lotes.")
+
+    def treinar_em_lotes(self, nome_tabela, colunas_features, coluna_label, where=None, tamanho_lote=None, prefetch=2):
+        # Treina direto do banco: uma thread lê e pré-processa os próximos `prefetch` lotes
+        # do db_manager enquanto o modelo é ajustado no lote atual
+        colunas = ', '.join(list(colunas_features) + [coluna_label])
+        num_features = len(colunas_features)
+
+        def preparar(linhas):
+            with instrumentacao.medir("treino.pre_processamento"):
+                return self.pre_processar_lote(*linhas_para_arrays(linhas, num_features))
+
+        passo = None  # Lotes inteiros até o monitor acusar falta de memória
+        for epoca in range(self.num_iteracoes):
+            lotes = self.db_manager.carregar_dados_em_lotes(nome_tabela, colunas, where, tamanho_lote)
+            with PrefetchLotes(lotes, preparar, prefetch) as pipeline:
+                for x, y in pipeline:
+                    passo = self._ajustar_passo(passo, len(x))
+                    with instrumentacao.medir("treino.ajuste_lote"):
+                        for x_parte, y_parte in self._partes(x, y, passo):
+                            self.ajustar_lote(x_parte, y_parte)
+            if self.logger:
+                self.logger.info(f"Época {epoca + 1}/{self.num_iteracoes} concluída")
+        return self.modelo
+
+    def importar_bibliotecas_e_dados_necessarios(self):
+        global train_test_split, accuracy_score
+        from sklearn.model_selection import train_test_split
+        from sklearn.metrics import accuracy_score
+
+    def avaliar_modelo(self, x_teste, y_teste):
+        with instrumentacao.medir("treino.predicao"):
+            y_predito = self.modelo.predict(x_teste)
+        return accuracy_score(y_teste, y_predito.round())
 
     def treinar_modelo(self, dados, iteracao):
-        x, y = self.pre_processar_dados(dados)
-        x_treino, x_teste, y_treino, y_teste = train_test_split(x, y, test_size=0.2, random_state=42)
-        self.modelo.fit(x_treino, y_treino, epochs=self.num_iteracoes, batch_size=32)
-        y_predito = self.modelo.predict(x_teste)
-        precisao = accuracy_score(y_teste, y_predito.round())
+        if "x_treino" in dados:
+            # Split já feito no processo principal por preparar_split
+            x_treino, x_teste, y_treino, y_teste = dados["x_treino"], dados["x_teste"], dados["y_treino"], dados["y_teste"]
+        else:
+            with instrumentacao.medir("treino.pre_processamento"):
+                x, y = self.pre_processar_dados(dados)
+                x_treino, x_teste, y_treino, y_teste = train_test_split(x, y, test_size=0.2, random_state=42)
+        if 'batch_size' not in self.kwargs:
+            self.controlador.estimar_batch(x_treino)
+        self._epocas_concluidas = 0
+        with instrumentacao.medir("treino.ajuste"):
+            self.controlador.executar_com_recuo(lambda batch_size: self.ajustar_modelo(x_treino, y_treino, batch_size), self.monitor)
+        precisao = self.avaliar_modelo(x_teste, y_teste)
         print(f"Iteração {iteracao}, Precisão: {precisao}")
         if self.logger:
             self.logger.info(f"Iteração {iteracao}, Precisão: {precisao}")
         return self.modelo, precisao
 
+def _treinar_instancia(especificacao, dados, i):
+    print(f"Treinando instância {i+1}")
+    if isinstance(dados, DadosCompartilhados):
+        dados = dados.anexar()
+    # O construtor já cria o único modelo usado por esta instância
+    treinador_instancia = TreinadorIA.a_partir_da_especificacao(especificacao)
+    treinador_instancia.configurar_logging(f'instancia_{i+1}')
+    treinador_instancia.monitorar_recursos()  # Monitorar recursos durante o treinamento
+    try:
+        modelo_instancia, precisao = treinador_instancia.treinar_modelo(dados, iteracao=i)
+    finally:
+        treinador_instancia.parar_monitor()
+    return treinador_instancia.exportar_modelo(modelo_instancia), precisao
+
+
+def mapear_com_limite(pool, funcao, tarefas, limite, ordenado=True):
+    # Como pool.imap/imap_unordered, mas com no máximo `limite` tarefas enviadas ao pool ao
+    # mesmo tempo. O pool é mantido entre rodadas e pode ter mais workers que o limite atual.
+    concluidas = queue.Queue()
+    tarefas = enumerate(tarefas)
+    prontos = {}
+    proximo = 0
+
+    def enviar():
+        for indice, tarefa in itertools.islice(tarefas, 1):
+            pool.apply_async(funcao, (tarefa,), callback=lambda resultado, i=indice: concluidas.put((i, True, resultado)),
+                             error_callback=lambda erro, i=indice: concluidas.put((i, False, erro)))
+            return 1
+        return 0
+
+    em_voo = sum(enviar() for _ in range(max(1, limite)))
+    while em_voo:
+        indice, sucesso, valor = concluidas.get()
+        em_voo -= 1
+        if not sucesso:
+            raise valor
+        em_voo += enviar()
+        if not ordenado:
+            yield valor
+            continue
+        prontos[indice] = valor
+        while proximo in prontos:
+            yield prontos.pop(proximo)
+            proximo += 1
+
+
+_barreira_worker = None
+
+
+def _inicializar_worker(classe, barreira):
+    # Initializer do pool: importa as bibliotecas pesadas uma vez por worker
+    global _barreira_worker
+    _barreira_worker = barreira
+    classe.importar_bibliotecas_e_dados_necessarios(classe.__new__(classe))
+
+
+def _sincronizar_worker(timeout):
+    _barreira_worker.wait(timeout)
+    return os.getpid()
+
+
+def _executar_tarefa(tarefa):
+    # Devolve (resultado, métricas da tarefa) para que o processo principal as agregue
+    return executar_com_metricas(_treinar_instancia, *tarefa)
+
+
+class MediaPesosIncremental:
+    # Média (opcionalmente ponderada) dos pesos acumulada em buffers float32 à medida
+    # que os resultados chegam; só um conjunto de pesos recebido fica vivo por vez
+    def __init__(self):
+        self.buffers = None
+        self.soma_pesos = 0.0
+
+    def adicionar(self, pesos_modelo, peso=1.0):
+        if peso <= 0:
+            return
+        with instrumentacao.medir("treino.combinacao_pesos"):
+            self.soma_pesos += peso
+            if self.buffers is None:
+                self.buffers = [np.array(camada, dtype=np.float32) for camada in pesos_modelo]
+                return
+            fator = peso / self.soma_pesos
+            for acumulado, novo in zip(self.buffers, pesos_modelo):
+                delta = np.subtract(novo, acumulado, dtype=np.float32)
+                delta *= fator
+                acumulado += delta
+
+
+_CallbackMonitor = None
+
+
+def _callback_monitor(treinador):
+    # A classe herda de um Callback do Keras, então só é criada depois que o TensorFlow é importado
+    global _CallbackMonitor
+    if _CallbackMonitor is None:
+        from tensorflow.keras.callbacks import Callback
+
+        class CallbackMonitor(Callback):
+            def __init__(self, treinador):
+                super().__init__()
+                self.treinador = treinador
+                self.falta_de_memoria = False
+
+            def on_train_batch_end(self, batch, logs=None):
+                if self.treinador.verificar_limites():
+                    self.falta_de_memoria = True
+                    self.model.stop_training = True
+
+            def on_epoch_end(self, epoch, logs=None):
+                # Uma época interrompida no meio não conta como concluída
+                if not self.falta_de_memoria:
+                    self.treinador._epocas_concluidas = epoch + 1
+
+        _CallbackMonitor = CallbackMonitor
+    return _CallbackMonitor(treinador)
+
+
 class TreinadorIATensorFlow(TreinadorIA):
     def __init__(self, db_manager, diretorio_temporario, num_iteracoes=10, **kwargs):
         super().__init__(db_manager, diretorio_temporario, num_iteracoes, **kwargs)
 
     def importar_bibliotecas_e_dados_necessarios(self):
-        import tensorflow as tf
+        global Sequential, to_categorical
+        super().importar_bibliotecas_e_dados_necessarios()
         from tensorflow.keras.models import Sequential
-        from tensorflow.keras.layers import Dense, Flatten
         from tensorflow.keras.utils import to_categorical
-        from sklearn.metrics import accuracy_score
+
+    def labels_esparsos(self):
+        # Labels inteiros (sparse_categorical_crossentropy) em vez de one-hot
+        loss = self.kwargs.get('loss')
+        return self.kwargs.get('labels_esparsos', isinstance(loss, str) and loss.startswith('sparse_'))
 
     def criar_modelo(self):
         # Criar o modelo usando TensorFlow
         input_shape = self.kwargs['input_shape']
         layers_config = self.kwargs['layers']
         optimizer = self.kwargs.get('optimizer', 'rmsprop')
-        loss = self.kwargs.get('loss', 'categorical_crossentropy')
+        loss = self.kwargs.get('loss', 'sparse_categorical_crossentropy' if self.labels_esparsos() else 'categorical_crossentropy')
         metrics = self.kwargs.get('metrics', ['accuracy'])
         
         model = Sequential()
@@ -118,51 +429,129 @@ class TreinadorIATensorFlow(TreinadorIA):
         return model
 
     def pre_processar_dados(self, dados):
+        # Com kwargs['diretorio_cache_pre_processamento'], o resultado fica em disco indexado
+        # pela impressão do dataset e é reaberto com mmap nas próximas execuções e nos workers
         x = dados["features"]
         y = dados["labels"]
+        cache = self._cache_pre_processamento(x, y)
+        if cache is None:
+            return self._pre_processar(x, y)
+        impressao = impressao_dados(x, y, parametros=self._parametros_pre_processamento())
+        return cache.obter(impressao, lambda: self._pre_processar(x, y))
+
+    def preparar_split(self, dados, semente=42):
+        # Com o cache ligado, o split pré-processado é gravado uma vez no cache e os workers
+        # abrem os próprios arquivos do cache, sem uma segunda cópia em dados_compartilhados_*
+        x = dados["features"]
+        y = dados["labels"]
+        cache = self._cache_pre_processamento(x, y)
+        if cache is None:
+            return super().preparar_split(dados, semente)
+
+        def calcular():
+            x_processado, y_processado = self._pre_processar(x, y)
+            return train_test_split(x_processado, y_processado, test_size=0.2, random_state=semente)
+
+        with instrumentacao.medir("treino.pre_processamento"):
+            impressao = impressao_dados(x, y, parametros=dict(self._parametros_pre_processamento(), split=(0.2, semente)))
+            caminhos = cache.obter_caminhos(impressao, calcular, nomes=("x_treino", "x_teste", "y_treino", "y_teste"))
+        return DadosCompartilhados.a_partir_de_arquivos(caminhos)
+
+    def _cache_pre_processamento(self, x, y):
+        # kwargs['cache_pre_processamento_tamanho_maximo'] limita o cache em bytes
+        diretorio_cache = self.kwargs.get('diretorio_cache_pre_processamento')
+        if not diretorio_cache or not isinstance(x, np.ndarray) or not isinstance(y, np.ndarray):
+            return None
+        return CachePreProcessamento(diretorio_cache, self.kwargs.get('cache_pre_processamento_tamanho_maximo'))
 
-        # Normalizar dados, se necessário
+    def pre_processar_lote(self, x, y):
+        # Lotes de treinar_em_lotes não passam pelo cache em disco
+        with instrumentacao.medir("treino.pre_processamento_lote"):
+            return self._pre_processar(x, y)
+
+    def _parametros_pre_processamento(self):
+        return {"divisor": self.kwargs.get('divisor_normalizacao', 255.0), "esparsos": self.labels_esparsos(),
+                "num_classes": self.kwargs.get('num_classes')}
+
+    def _pre_processar(self, x, y):
+        # Normalizar dados, se necessário, num único buffer float32
         if isinstance(x, np.ndarray):
-            x = x.astype('float32') / 255.0
-        
-        # Transformar labels em formato one-hot encoding
+            x = normalizar(x, self.kwargs.get('divisor_normalizacao', 255.0))
+
         if isinstance(y, np.ndarray):
-            y = to_categorical(y)
+            if self.labels_esparsos():
+                y = labels_inteiros(y)
+            else:
+                # Transformar labels em formato one-hot encoding; com num_classes o formato
+                # fica igual em todos os lotes de treinar_em_lotes
+                y = to_categorical(y, num_classes=self.kwargs.get('num_classes'))
 
         return x, y
 
-    def combinar_pesos(self, instancias_modelos):
-        # Combinar os pesos e biases dos modelos treinados
-        numero_modelos = len(instancias_modelos)
+    def avaliar_modelo(self, x_teste, y_teste):
+        if not self.labels_esparsos():
+            return super().avaliar_modelo(x_teste, y_teste)
+        with instrumentacao.medir("treino.predicao"):
+            y_predito = self.modelo.predict(x_teste)
+        return accuracy_score(y_teste, y_predito.argmax(axis=-1))
+
+    def ajustar_modelo(self, x, y, batch_size):
+        # O callback aplica as violações do monitor a cada lote do fit. Falta de memória
+        # interrompe o fit com MemoryError; executar_com_recuo então reduz o lote e o fit
+        # continua da primeira época não concluída
+        callback = _callback_monitor(self)
+        self.modelo.fit(x, y, epochs=self.num_iteracoes, initial_epoch=self._epocas_concluidas,
+                        batch_size=batch_size, callbacks=[callback])
+        if callback.falta_de_memoria:
+            raise MemoryError("Limite de memória excedido durante o treinamento")
+
+    def ajustar_lote(self, x, y):
+        self.modelo.train_on_batch(x, y)
+
+    def exportar_modelo(self, modelo):
+        # Devolver só os arrays de pesos evita serializar o modelo Keras inteiro pelo pool
+        return modelo.get_weights()
+
+    def combinar_pesos(self, instancias_modelos, ponderar_por_precisao=False):
+        # Combinar os pesos e biases dos modelos treinados com uma média incremental;
+        # instancias_modelos pode ser qualquer iterável de (pesos ou modelo, precisão)
+        media = MediaPesosIncremental()
+        for pesos, precisao in instancias_modelos:
+            if hasattr(pesos, "get_weights"):
+                pesos = pesos.get_weights()
+            media.adicionar(pesos, precisao if ponderar_por_precisao else 1.0)
         modelo_base = self.criar_modelo()
-        for camada in range(len(modelo_base.layers)):
-            pesos = [instancia[0].layers[camada].get_weights() for instancia in instancias_modelos]
-            nova_pesos = [np.mean([peso[i] for peso in pesos], axis=0) for i in range(len(pesos[0]))]
-            modelo_base.layers[camada].set_weights(nova_pesos)
+        if media.buffers is not None:
+            modelo_base.set_weights(media.buffers)
         return modelo_base
 
-    def salvar_melhor_pesos(self, modelo):
-        # Salvar os melhores pesos do modelo treinado
-        caminho_melhor_pesos = os.path.join(self.diretorio_temporario, "melhor_pesos.h5")
-        modelo.save_weights(caminho_melhor_pesos)
+    def salvar_melhor_pesos(self, modelo, instancia=None, rodada=None):
+        # Salvar os melhores pesos do modelo treinado como lista de arrays, que pode ser
+        # reaberta com mmap em vez de copiada para cada processo
+        caminho_melhor_pesos = self.checkpoints.salvar(modelo.get_weights(), "melhor_pesos", instancia, rodada)
         print(f"Pesos salvos em: {caminho_melhor_pesos}")
         return caminho_melhor_pesos
 
+    def carregar_melhor_pesos(self, caminho, mmap=False):
+        modelo = self.criar_modelo()
+        modelo.set_weights(self.checkpoints.carregar(caminho, mmap))
+        return modelo
+
 
 class TreinadorIAScikitLearn(TreinadorIA):
     def __init__(self, db_manager, diretorio_temporario, num_iteracoes=10, **kwargs):
         super().__init__(db_manager, diretorio_temporario, num_iteracoes, **kwargs)
 
     def importar_bibliotecas_e_dados_necessarios(self):
-        import sklearn
+        global RandomForestClassifier, StandardScaler, make_pipeline
+        super().importar_bibliotecas_e_dados_necessarios()
         from sklearn.ensemble import RandomForestClassifier
         from sklearn.preprocessing import StandardScaler
         from sklearn.pipeline import make_pipeline
-        from sklearn.metrics import accuracy_score
 
     def criar_modelo(self):
         # Criar o modelo usando scikit-learn
-        modelo = make_pipeline(StandardScaler(), RandomForestClassifier(n_estimators=100))
+        modelo = make_pipeline(StandardScaler(), RandomForestClassifier(n_estimators=self.kwargs.get('n_estimators', 100)))
         return modelo
 
     def pre_processar_dados(self, dados):
@@ -170,15 +559,89 @@ class TreinadorIAScikitLearn(TreinadorIA):
         y = dados["labels"]
         return x, y
 
-    def combinar_pesos(self, instancias_modelos):
+    def ajustar_modelo(self, x, y, batch_size):
+        # O pipeline do scikit-learn não tem épocas nem lotes
+        self.modelo.fit(x, y)
+
+    def treinar_em_lotes(self, nome_tabela, colunas_features, coluna_label, where=None, tamanho_lote=None, prefetch=2):
+        # O pipeline padrão (StandardScaler + floresta) não tem partial_fit; o treinamento em
+        # lotes do scikit-learn é o de treinar_incremental, com os lotes lidos do banco
+        from DataExpansion.pipeline_dados import fonte_banco
+
+        fonte = fonte_banco(self.db_manager, nome_tabela, colunas_features, coluna_label, where, tamanho_lote)
+        return self.treinar_incremental(fonte, prefetch)
+
+    def treinar_incremental(self, fonte, prefetch=2):
+        # Treinamento fora da memória: `fonte` é uma função que devolve um novo iterador de
+        # lotes (x, y) a cada chamada (ver pipeline_dados.fonte_banco/fonte_arquivo).
+        # Florestas (padrão) são treinadas por bloco em paralelo e depois unidas num só
+        # ensemble; estimadores com partial_fit (ex.: SGDClassifier, passado em
+        # kwargs['estimador_incremental']) são treinados lote a lote com um StandardScaler
+        # ajustado incrementalmente.
+        from sklearn.base import clone
+        from sklearn.ensemble import ExtraTreesClassifier
+
+        estimador = self.kwargs.get('estimador_incremental')
+        if estimador is None or isinstance(estimador, (RandomForestClassifier, ExtraTreesClassifier)):
+            self.modelo = self._treinar_florestas_por_bloco(fonte, estimador, prefetch)
+        elif hasattr(estimador, "partial_fit"):
+            self.modelo = self._treinar_partial_fit(fonte, clone(estimador), prefetch)
+        else:
+            raise ValueError(f"O estimador {type(estimador).__name__} não é uma floresta nem tem partial_fit.")
+        return self.modelo
+
+    def _treinar_florestas_por_bloco(self, fonte, estimador, prefetch):
+        from DataExpansion.treinamento_incremental import treinar_florestas_por_bloco, combinar_florestas
+
+        if estimador is None:
+            classe, parametros = RandomForestClassifier, {"n_estimators": self.kwargs.get('n_estimators_por_bloco', 10)}
+        else:
+            classe, parametros = type(estimador), estimador.get_params()
+        num_processos = self.controlador.estimar_instancias(os.cpu_count() or 1, self.kwargs.get('memoria_por_instancia'))
+        pool = self._obter_pool(num_processos)
+        with PrefetchLotes(fonte(), prefetch=prefetch) as lotes:
+            # max_em_voo = num_processos: o pool pode ter mais workers que o estimado agora
+            florestas = treinar_florestas_por_bloco(pool, lotes, classe, parametros, max_em_voo=num_processos)
+        return combinar_florestas(florestas)
+
+    def _treinar_partial_fit(self, fonte, estimador, prefetch):
+        from sklearn.base import is_classifier
+
+        classes = self.kwargs.get('classes')
+        if is_classifier(estimador) and classes is None:
+            raise ValueError("Informe kwargs['classes'] para treinar um classificador com partial_fit.")
+        # Primeira passada só ajusta o scaler; as seguintes treinam com os dados já escalados
+        scaler = StandardScaler()
+        with PrefetchLotes(fonte(), prefetch=prefetch) as lotes:
+            for x, _ in lotes:
+                scaler.partial_fit(x)
+        passo = None
+        for epoca in range(self.num_iteracoes):
+            with PrefetchLotes(fonte(), lambda lote: (scaler.transform(lote[0]), lote[1]), prefetch) as lotes:
+                for x, y in lotes:
+                    passo = self._ajustar_passo(passo, len(x))
+                    with instrumentacao.medir("treino.ajuste_lote"):
+                        for x_parte, y_parte in self._partes(x, y, passo):
+                            if is_classifier(estimador):
+                                estimador.partial_fit(x_parte, y_parte, classes=classes)
+                            else:
+                                estimador.partial_fit(x_parte, y_parte)
+            if self.logger:
+                self.logger.info(f"Época {epoca + 1}/{self.num_iteracoes} concluída")
+        return make_pipeline(scaler, estimador)
+
+    def combinar_pesos(self, instancias_modelos, ponderar_por_precisao=False):
         # Combinar pesos em modelos de scikit-learn não é trivial,
         # então para simplificar vamos escolher o modelo com a maior precisão
         melhor_modelo = max(instancias_modelos, key=lambda x: x[1])[0]
         return melhor_modelo
 
-    def salvar_melhor_pesos(self, modelo):
+    def salvar_melhor_pesos(self, modelo, instancia=None, rodada=None):
         # Salvar o melhor modelo usando joblib
-        caminho_melhor_modelo = os.path.join(self.diretorio_temporario, "melhor_modelo_sklearn.joblib")
-        dump(modelo, caminho_melhor_modelo)
+        caminho_melhor_modelo = self.checkpoints.salvar(modelo, "melhor_modelo_sklearn", instancia, rodada)
         print(f"Modelo salvo em: {caminho_melhor_modelo}")
         return caminho_melhor_modelo
+
+    def carregar_melhor_pesos(self, caminho, mmap=False):
+        # Com mmap=True os arrays das árvores são compartilhados entre processos de inferência
+        return self.checkpoints.carregar(caminho, mmap)
@@ -0,0 +1,282 @@
+"""Benchmarks reprodutíveis dos caminhos críticos do AICluster.
+
+Roda offline, com SQLite e dados sintéticos gerados com Faker, e grava os resultados em JSON:
+
+    python benchmarks/benchmark.py --linhas 200000 --processos 4 --saida resultados.json
+    python benchmarks/benchmark.py --baseline resultados.json --tolerancia 0.1
+
+Cada benchmark roda num processo novo, para que o pico de RSS medido seja só dele.
+Com --baseline, as métricas são comparadas com um resultado anterior e o script sai com
+código 1 se alguma piorar mais do que a tolerância; o baseline precisa ter sido gerado com
+os mesmos --linhas e --processos. Também sai com código 1 se a importação
+de DataExpansion, DatabaseManager ou treining passar de tempo_importacao.ORCAMENTO_SEGUNDOS.
+"""
+import argparse
+import contextlib
+import csv
+import io
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Permite rodar a partir de um checkout sem instalar o pacote; o PYTHONPATH também vale para os subprocessos
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+os.environ["PYTHONPATH"] = os.pathsep.join(filter(None, [RAIZ, os.environ.get("PYTHONPATH")]))
+
+COLUNAS_FEATURES = ["f0", "f1", "f2", "f3", "f4", "f5", "f6", "f7"]
+
+
+def _pico_rss():
+    try:
+        import resource
+    except ImportError:  # Windows
+        import psutil
+        return psutil.Process().memory_info().peak_wset
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico if sys.platform == "darwin" else pico * 1024  # Linux informa em KiB
+
+
+def gerar_linhas(num_linhas, semente=42):
+    # Linhas sintéticas com texto do Faker e features numéricas; os textos são gerados
+    # uma vez e reaproveitados, para que o Faker não domine o tempo medido
+    import numpy as np
+    from faker import Faker
+
+    Faker.seed(semente)
+    fake = Faker()
+    nomes = [fake.name() for _ in range(1000)]
+    emails = [fake.email() for _ in range(1000)]
+    gerador = np.random.default_rng(semente)
+    features = gerador.random((num_linhas, len(COLUNAS_FEATURES)))
+    labels = (features[:, 0] + features[:, 1] > 1).astype(int)
+    for i in range(num_linhas):
+        linha = {"nome": nomes[i % 1000], "email": emails[i % 1000], "label": int(labels[i])}
+        linha.update(zip(COLUNAS_FEATURES, features[i].tolist()))
+        yield linha
+
+
+def _criar_banco(diretorio, **kwargs):
+    from DataExpansion.DatabaseManager import DatabaseManager
+
+    db_manager = DatabaseManager("sqlite", db_path=os.path.join(diretorio, "benchmark.db"), **kwargs)
+    colunas = ", ".join(f"{coluna} REAL" for coluna in COLUNAS_FEATURES)
+    db_manager._execute_query(f"CREATE TABLE IF NOT EXISTS dados_treinamento (nome TEXT, email TEXT, label INTEGER, {colunas})")
+    return db_manager
+
+
+def bench_salvar_dados(num_linhas, diretorio):
+    db_manager = _criar_banco(diretorio)
+    linhas = list(gerar_linhas(num_linhas))
+    with contextlib.redirect_stdout(io.StringIO()):
+        resultado = db_manager.salvar_dados(linhas, "dados_treinamento")
+    db_manager.close()
+    return {"linhas": resultado["linhas"], "segundos": resultado["segundos"], "linhas_por_segundo": resultado["linhas_por_segundo"]}
+
+
+def bench_carregar_dados(num_linhas, diretorio):
+    db_manager = _criar_banco(diretorio)
+    with contextlib.redirect_stdout(io.StringIO()):
+        db_manager.salvar_dados(gerar_linhas(num_linhas), "dados_treinamento")
+    metricas = {}
+
+    inicio = time.perf_counter()
+    total = len(db_manager.carregar_dados("dados_treinamento"))
+    metricas["carregar_dados_linhas_por_segundo"] = total / (time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    total = sum(len(lote) for lote in db_manager.carregar_dados_em_lotes("dados_treinamento"))
+    metricas["em_lotes_linhas_por_segundo"] = total / (time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    arrays = db_manager.carregar_arrays("dados_treinamento", COLUNAS_FEATURES, "label")
+    metricas["arrays_linhas_por_segundo"] = len(arrays["labels"]) / (time.perf_counter() - inicio)
+    db_manager.close()
+    return metricas
+
+
+def bench_copiar_dados_treinamento(num_linhas, diretorio, num_processos):
+    # Divide as linhas em arquivos CSV, JSON e JSONL, como num diretório de dados real
+    diretorio_dados = os.path.join(diretorio, "dados")
+    os.makedirs(diretorio_dados)
+    linhas = list(gerar_linhas(num_linhas))
+    por_arquivo = max(1, len(linhas) // (3 * num_processos))
+    for numero, inicio in enumerate(range(0, len(linhas), por_arquivo)):
+        bloco = linhas[inicio:inicio + por_arquivo]
+        caminho = os.path.join(diretorio_dados, f"parte_{numero:04d}")
+        formato = numero % 3
+        if formato == 0:
+            with open(caminho + ".csv", "w", encoding="utf-8", newline="") as f:
+                escritor = csv.DictWriter(f, fieldnames=list(bloco[0]))
+                escritor.writeheader()
+                escritor.writerows(bloco)
+        elif formato == 1:
+            with open(caminho + ".json", "w", encoding="utf-8") as f:
+                json.dump(bloco, f)
+        else:
+            with open(caminho + ".jsonl", "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(linha) + "\n" for linha in bloco)
+    del linhas
+
+    db_manager = _criar_banco(diretorio)
+    with contextlib.redirect_stdout(io.StringIO()):
+        completo = db_manager.copiar_dados_treinamento(None, None, diretorio_dados, num_processos=num_processos)
+        # Segunda execução: nada mudou, então o manifesto deve pular todos os arquivos
+        inicio = time.perf_counter()
+        db_manager.copiar_dados_treinamento(None, None, diretorio_dados, num_processos=num_processos)
+        segundos_sem_alteracoes = time.perf_counter() - inicio
+    db_manager.close()
+    return {"linhas": completo["linhas"], "segundos": completo["segundos"],
+            "linhas_por_segundo": completo["linhas_por_segundo"], "segundos_sem_alteracoes": segundos_sem_alteracoes}
+
+
+def _pontos_escala(num_processos):
+    # Potências de 2 até num_processos, mais o próprio num_processos (ex.: 6 -> 1, 2, 4, 6)
+    return sorted({2 ** k for k in range(num_processos.bit_length())} | {num_processos})
+
+
+def bench_treinar_multiplas_instancias(num_linhas, diretorio, num_processos):
+    # Escalabilidade do treinamento paralelo: num_processos instâncias com 1, 2, 4... processos
+    # simultâneos, sempre incluindo o próprio num_processos. O pool é criado e aquecido uma vez, com num_processos workers, e o split é
+    # publicado uma vez, então só o treinamento entra no tempo medido.
+    import numpy as np
+    from DataExpansion.treining import TreinadorIAScikitLearn
+
+    gerador = np.random.default_rng(42)
+    x = gerador.random((num_linhas, len(COLUNAS_FEATURES)))
+    dados = {"features": x, "labels": (x[:, 0] + x[:, 1] > 1).astype(int)}
+    metricas = {}
+    base = None
+    treinador = TreinadorIAScikitLearn(None, diretorio, n_estimators=20)
+    compartilhados = treinador.preparar_split(dados)
+    try:
+        treinador.aquecer_pool(num_processos)
+        for processos in _pontos_escala(num_processos):
+            with contextlib.redirect_stdout(io.StringIO()):
+                inicio = time.perf_counter()
+                treinador.treinar_multiplas_instancias(compartilhados, num_processos, num_processos=processos)
+                segundos = time.perf_counter() - inicio
+            base = base or segundos
+            metricas[f"segundos_{processos}_processos"] = segundos
+            metricas[f"aceleracao_{processos}_processos"] = base / segundos
+    finally:
+        treinador.encerrar_pool()
+        compartilhados.liberar()
+    return metricas
+
+
+def _executar_isolado(args):
+    nome, parametros = args
+    funcao = BENCHMARKS[nome]
+    with tempfile.TemporaryDirectory() as diretorio:
+        metricas = funcao(diretorio=diretorio, **parametros)
+    metricas["pico_rss"] = _pico_rss()
+    return metricas
+
+
+BENCHMARKS = {
+    "salvar_dados": bench_salvar_dados,
+    "carregar_dados": bench_carregar_dados,
+    "copiar_dados_treinamento": bench_copiar_dados_treinamento,
+    "treinar_multiplas_instancias": bench_treinar_multiplas_instancias,
+}
+
+
+def executar(num_linhas, num_processos, selecionados):
+    from DataExpansion.tempo_importacao import verificar_orcamentos
+
+    resultados = {f"importacao_{modulo}": resultado for modulo, resultado in verificar_orcamentos().items()}
+    parametros = {
+        "salvar_dados": {"num_linhas": num_linhas},
+        "carregar_dados": {"num_linhas": num_linhas},
+        "copiar_dados_treinamento": {"num_linhas": num_linhas, "num_processos": num_processos},
+        "treinar_multiplas_instancias": {"num_linhas": min(num_linhas, 20000), "num_processos": num_processos},
+    }
+    contexto = multiprocessing.get_context("spawn")
+    for nome in selecionados:
+        print(f"Executando {nome}...")
+        # Um processo por benchmark, para isolar o pico de RSS; o executor é usado no lugar de um
+        # multiprocessing.Pool porque os workers do Pool são daemon e não podem criar processos
+        with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as executor:
+            resultados[nome] = executor.submit(_executar_isolado, (nome, parametros[nome])).result()
+    return {
+        "ambiente": {"python": platform.python_version(), "plataforma": platform.platform(), "cpus": os.cpu_count()},
+        "parametros": {"linhas": num_linhas, "processos": num_processos},
+        "resultados": resultados,
+    }
+
+
+def _maior_e_melhor(metrica):
+    return "por_segundo" in metrica or metrica.startswith("aceleracao")
+
+
+def comparar(atual, baseline, tolerancia):
+    # Devolve as métricas que pioraram mais que a tolerância em relação ao baseline. Resultados
+    # com outros parâmetros (linhas, processos) não são comparáveis e levantam ValueError.
+    if baseline.get("parametros") != atual["parametros"]:
+        raise ValueError(f"baseline gerado com parâmetros {baseline.get('parametros')}, "
+                         f"diferentes dos atuais {atual['parametros']}")
+    regressoes = []
+    for nome, metricas in atual["resultados"].items():
+        for metrica, valor in metricas.items():
+            anterior = baseline.get("resultados", {}).get(nome, {}).get(metrica)
+            if not anterior or isinstance(valor, bool) or not isinstance(valor, (int, float)):
+                continue
+            variacao = (valor - anterior) / anterior
+            if _maior_e_melhor(metrica):
+                variacao = -variacao
+            if variacao > tolerancia:
+                regressoes.append((nome, metrica, anterior, valor, variacao))
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--linhas", type=int, default=100000, help="Linhas do dataset sintético")
+    parser.add_argument("--processos", type=int, default=os.cpu_count() or 1, help="Máximo de processos paralelos")
+    parser.add_argument("--benchmarks", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--saida", default="resultados_benchmark.json", help="Arquivo JSON de resultados")
+    parser.add_argument("--baseline", help="JSON de uma execução anterior para comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.1, help="Piora relativa aceita antes de acusar regressão")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        # Confere os parâmetros antes de rodar, para não gastar a execução inteira à toa
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        parametros = {"linhas": args.linhas, "processos": args.processos}
+        if baseline.get("parametros") != parametros:
+            parser.error(f"o baseline {args.baseline} foi gerado com {baseline.get('parametros')}; "
+                         f"rode com os mesmos parâmetros ({parametros} agora)")
+
+    resultado = executar(args.linhas, args.processos, args.benchmarks)
+    with open(args.saida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, indent=2)
+    print(json.dumps(resultado["resultados"], indent=2))
+    print(f"Resultados salvos em: {args.saida}")
+
+    # Importar o pacote acima do orçamento é uma falha, com ou sem baseline
+    acima_do_orcamento = [nome for nome, metricas in resultado["resultados"].items()
+                          if metricas.get("dentro_do_orcamento") is False]
+    for nome in acima_do_orcamento:
+        metricas = resultado["resultados"][nome]
+        print(f"Aviso: {nome} levou {metricas['segundos'] * 1000:.1f} ms (orçamento: {metricas['orcamento'] * 1000:.0f} ms)")
+    if baseline is not None:
+        regressoes = comparar(resultado, baseline, args.tolerancia)
+        for nome, metrica, anterior, valor, variacao in regressoes:
+            print(f"Regressão em {nome}.{metrica}: {anterior:.4g} -> {valor:.4g} ({variacao:+.1%} pior)")
+        if regressoes:
+            sys.exit(1)
+        print("Nenhuma regressão em relação ao baseline.")
+    if acima_do_orcamento:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
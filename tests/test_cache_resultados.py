@@ -0,0 +1,29 @@
+from DataExpansion.DatabaseManager import DatabaseManager
+
+
+def _banco(caminho, diretorio_cache, valor):
+    db_manager = DatabaseManager("sqlite", db_path=str(caminho), cache_resultados=True, diretorio_cache=str(diretorio_cache))
+    db_manager._execute_query("CREATE TABLE IF NOT EXISTS t (x REAL, y INTEGER)")
+    if not db_manager.carregar_dados("t"):
+        db_manager._execute_query("INSERT INTO t VALUES (?, 1)", (valor,))
+    return db_manager
+
+
+def test_bancos_diferentes_nao_dividem_entradas_no_disco(tmp_path):
+    cache = tmp_path / "cache"
+    resultados = []
+    for nome, valor in (("a.db", 1.0), ("b.db", 2.0)):
+        db_manager = _banco(tmp_path / nome, cache, valor)
+        resultados.append(db_manager.carregar_arrays("t", ["x"], "y")["features"].tolist())
+        db_manager.close()
+    assert resultados == [[[1.0]], [[2.0]]]
+
+
+def test_mesmo_banco_reaproveita_a_entrada_do_disco(tmp_path):
+    cache = tmp_path / "cache"
+    for _ in range(2):
+        db_manager = _banco(tmp_path / "a.db", cache, 1.0)
+        assert db_manager.carregar_arrays("t", ["x"], "y")["features"].tolist() == [[1.0]]
+        estatisticas = db_manager.cache_resultados.estatisticas()
+        db_manager.close()
+    assert estatisticas["acertos"] == 1
@@ -0,0 +1,55 @@
+import json
+import os
+
+from DataExpansion.DatabaseManager import COLUNA_ORIGEM, DatabaseManager
+
+
+def _preparar(tmp_path):
+    diretorio = tmp_path / "dados"
+    diretorio.mkdir()
+    db_manager = DatabaseManager("sqlite", db_path=str(tmp_path / "banco.db"))
+    db_manager._execute_query("CREATE TABLE dados_treinamento (a INTEGER, b TEXT)")
+    return db_manager, diretorio
+
+
+def _escrever(caminho, inicio, fim, modo="w"):
+    with open(caminho, modo, encoding="utf-8") as f:
+        for i in range(inicio, fim):
+            f.write(json.dumps({"a": i, "b": "v"}) + "\n")
+    # Garante um mtime diferente mesmo em sistemas de arquivos com resolução baixa
+    estado = os.stat(caminho)
+    os.utime(caminho, (estado.st_atime, estado.st_mtime + 1))
+
+
+def _contar(db_manager):
+    return db_manager._execute_query("SELECT COUNT(*), COUNT(DISTINCT a) FROM dados_treinamento")[0]
+
+
+def test_esquema_nao_muda_por_padrao(tmp_path):
+    db_manager, diretorio = _preparar(tmp_path)
+    _escrever(diretorio / "x.jsonl", 0, 100)
+    db_manager.copiar_dados_treinamento(None, None, str(diretorio), num_processos=1)
+    assert COLUNA_ORIGEM not in db_manager._tipos_colunas("dados_treinamento")
+    assert all(len(linha) == 2 for linha in db_manager.carregar_dados("dados_treinamento"))
+
+    _escrever(diretorio / "x.jsonl", 100, 110, modo="a")
+    db_manager.copiar_dados_treinamento(None, None, str(diretorio), num_processos=1)
+    assert _contar(db_manager) == (110, 110)
+
+    db_manager.copiar_dados_treinamento(None, None, str(diretorio), num_processos=1)
+    assert _contar(db_manager) == (110, 110)
+    db_manager.close()
+
+
+def test_rastrear_origem_troca_as_linhas_de_um_arquivo_reescrito(tmp_path):
+    db_manager, diretorio = _preparar(tmp_path)
+    _escrever(diretorio / "x.jsonl", 0, 100)
+    _escrever(diretorio / "y.jsonl", 1000, 1050)
+    db_manager.copiar_dados_treinamento(None, None, str(diretorio), num_processos=1, rastrear_origem=True)
+    assert _contar(db_manager) == (150, 150)
+
+    _escrever(diretorio / "x.jsonl", 0, 60)
+    # A coluna já existe, então continua sendo usada mesmo sem pedir de novo
+    db_manager.copiar_dados_treinamento(None, None, str(diretorio), num_processos=1)
+    assert _contar(db_manager) == (110, 110)
+    db_manager.close()
@@ -0,0 +1,125 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from DataExpansion import DatabaseManagerAsync
+from DataExpansion.pool_conexoes import PoolConexoesAsync
+
+
+class CursorAsyncFalso:
+    # Imita o cursor do mysql.connector.aio sobre um sqlite3 (placeholders %s viram ?)
+    def __init__(self, conexao):
+        self._conexao = conexao
+        self._cursor = conexao.cursor()
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    async def execute(self, query, params=None):
+        if "information_schema.columns" in query:
+            query, params = f"SELECT name, type FROM pragma_table_info('{params[0]}')", ()
+        self._cursor.execute(query.replace("%s", "?"), params or ())
+
+    async def executemany(self, query, linhas):
+        self._cursor.executemany(query.replace("%s", "?"), linhas)
+
+    async def fetchall(self):
+        return self._cursor.fetchall()
+
+    async def fetchmany(self, tamanho):
+        return self._cursor.fetchmany(tamanho)
+
+    async def close(self):
+        self._cursor.close()
+
+
+class ConexaoAsyncFalsa:
+    def __init__(self, caminho):
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self.fechada = False
+
+    async def cursor(self, buffered=None):
+        return CursorAsyncFalso(self._conexao)
+
+    async def commit(self):
+        self._conexao.commit()
+
+    async def rollback(self):
+        self._conexao.rollback()
+
+    async def consume_results(self):
+        pass
+
+    async def ping(self, reconnect=False):
+        pass
+
+    async def close(self):
+        self.fechada = True
+        self._conexao.close()
+
+
+def _manager_mysql(tmp_path, **kwargs):
+    db = DatabaseManagerAsync("mysql", pool_size=2, **kwargs)
+    caminho = str(tmp_path / "banco.db")
+
+    async def criar():
+        return ConexaoAsyncFalsa(caminho)
+
+    db._criar_conexao = criar
+    return db
+
+
+def test_mysql_usa_o_caminho_nativo(tmp_path):
+    async def cenario():
+        async with _manager_mysql(tmp_path) as db:
+            assert db.nativo
+            await db._execute_query("CREATE TABLE t (x REAL, y INTEGER, nome TEXT)")
+            linhas = [{"x": i / 2, "y": i % 2, "nome": f"n{i}"} for i in range(25)]
+            resultado = await db.salvar_dados(linhas, "t", tamanho_lote=10)
+            assert resultado["linhas"] == 25
+            assert len(await db.carregar_dados("t", filtros={"y": 1})) == 12
+            lotes = [len(lote) async for lote in db.carregar_dados_em_lotes("t", tamanho_lote=10)]
+            assert lotes == [10, 10, 5]
+            arrays = await db.carregar_arrays("t", ["x"], "y")
+            assert arrays["features"].shape == (25, 1) and arrays["labels"].tolist() == [i % 2 for i in range(25)]
+            metricas = db.metricas_pool()
+            assert metricas["em_uso"] == 0 and metricas["criadas"] <= 2
+            assert db._executor is None  # Nenhuma thread envolvida
+
+    asyncio.run(cenario())
+
+
+def test_sqlite_continua_no_executor(tmp_path):
+    async def cenario():
+        async with DatabaseManagerAsync("sqlite", db_path=str(tmp_path / "banco.db")) as db:
+            assert not db.nativo
+            await db._execute_query("CREATE TABLE t (x REAL)")
+            await db.salvar_dados([{"x": 1.0}], "t")
+            assert await db.carregar_dados("t") == [(1.0,)]
+
+    asyncio.run(cenario())
+
+
+def test_pool_async_limita_conexoes_e_espera():
+    criadas = []
+
+    async def criar():
+        criadas.append(ConexaoAsyncFalsa(":memory:"))
+        return criadas[-1]
+
+    async def cenario():
+        pool = PoolConexoesAsync(criar, tamanho=1, timeout=0.05)
+        conn = await pool.obter()
+        with pytest.raises(TimeoutError):
+            await pool.obter()
+        asyncio.get_running_loop().call_later(0.01, lambda: asyncio.ensure_future(pool.devolver(conn)))
+        assert await pool.obter(timeout=1.0) is conn
+        await pool.devolver(conn, descartar=True)
+        assert conn.fechada and pool.metricas()["em_uso"] == 0
+        await pool.fechar_todas()
+        with pytest.raises(RuntimeError):
+            await pool.obter()
+
+    asyncio.run(cenario())
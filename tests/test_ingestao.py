@@ -0,0 +1,100 @@
+import io
+import json
+import os
+import signal
+
+import pytest
+
+from DataExpansion import ingestao
+from DataExpansion.ingestao import _iterar_json, iterar_lotes_diretorio, ler_arquivo_em_lotes
+
+DOCUMENTOS_VALIDOS = [
+    '[]',
+    '  [ ]  ',
+    '[1]',
+    '[1, 2, 3]',
+    '\n[\n  {"a": 1, "b": [1, 2, {"c": "]"}]},\n  {"d": "x, y"}\n]\n',
+    '[12345, -6.02e23, 0.5E-3, 1e+2, 7]',
+    '[true, false, null, "tru", "nul"]',
+    '["\\"]\\",", "\\u00e9", "ção"]',
+    '[[], {}, [[1]], {"a": {}}]',
+    '{"a": 1}',
+    '"texto"',
+]
+
+DOCUMENTOS_INVALIDOS = [
+    '[1 2 3]',
+    '[{"a":1}{"b":2}]',
+    '[,,1,]',
+    '[,1]',
+    '[1,,2]',
+    '[1,]',
+    '[1, 2] trailing',
+    '[1] [2]',
+    '[1',
+    '[1,',
+    '[',
+    '[tru]',
+    '',
+]
+
+
+def _ler(texto, tamanho_bloco):
+    return list(_iterar_json(io.StringIO(texto), tamanho_bloco=tamanho_bloco))
+
+
+@pytest.mark.parametrize("texto", DOCUMENTOS_VALIDOS)
+def test_igual_ao_json_loads_em_qualquer_tamanho_de_bloco(texto):
+    esperado = json.loads(texto)
+    esperado = esperado if isinstance(esperado, list) else [esperado]
+    # Cada tamanho de bloco põe uma fronteira de leitura numa posição diferente do documento
+    for tamanho_bloco in range(1, len(texto) + 2):
+        assert _ler(texto, tamanho_bloco) == esperado, tamanho_bloco
+
+
+@pytest.mark.parametrize("texto", DOCUMENTOS_INVALIDOS)
+def test_rejeita_o_que_json_loads_rejeita(texto):
+    with pytest.raises(ValueError):
+        json.loads(texto)
+    for tamanho_bloco in range(1, len(texto) + 2):
+        with pytest.raises(ValueError):
+            _ler(texto, tamanho_bloco)
+
+
+def test_ler_arquivo_em_lotes_json(tmp_path):
+    linhas = [{"id": i, "nome": f"linha {i}"} for i in range(25)]
+    caminho = tmp_path / "dados.json"
+    caminho.write_text(json.dumps(linhas, indent=2), encoding="utf-8")
+
+    lotes = list(ler_arquivo_em_lotes(str(caminho), tamanho_lote=10))
+    assert [len(lote) for lote in lotes] == [10, 10, 5]
+    assert [linha for lote in lotes for linha in lote] == linhas
+
+    retomados = list(ler_arquivo_em_lotes(str(caminho), tamanho_lote=10, pular_linhas=20))
+    assert retomados == [linhas[20:]]
+
+
+def _leitor_morto(fila_arquivos, fila_lotes, tamanho_lote):
+    os.kill(os.getpid(), signal.SIGKILL)  # Simula o leitor sendo morto (ex.: OOM) antes do "fim"
+
+
+def test_iterar_lotes_diretorio_leitores_normais(tmp_path):
+    caminhos = []
+    for i in range(3):
+        caminho = tmp_path / f"dados{i}.json"
+        caminho.write_text(json.dumps([{"id": i}] * 5), encoding="utf-8")
+        caminhos.append(str(caminho))
+
+    eventos = list(iterar_lotes_diretorio(caminhos, num_processos=2, tamanho_lote=2))
+    assert sorted(filepath for tipo, filepath, _ in eventos if tipo == "arquivo") == caminhos
+    assert sum(len(linhas) for tipo, _, linhas in eventos if tipo == "lote") == 15
+
+
+def test_iterar_lotes_diretorio_falha_se_um_leitor_morrer(tmp_path, monkeypatch):
+    caminho = tmp_path / "dados.json"
+    caminho.write_text("[1, 2, 3]", encoding="utf-8")
+    monkeypatch.setattr(ingestao, "_leitor", _leitor_morto)
+    monkeypatch.setattr(ingestao, "_INTERVALO_VERIFICACAO", 0.05)
+
+    with pytest.raises(RuntimeError, match="código de saída -9"):
+        list(iterar_lotes_diretorio([str(caminho)], num_processos=1))
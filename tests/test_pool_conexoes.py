@@ -0,0 +1,125 @@
+import threading
+import time
+
+import pytest
+
+from DataExpansion.DatabaseManager import DatabaseManager
+from DataExpansion.pool_conexoes import PoolConexoes
+
+
+class ConexaoFalsa:
+    def __init__(self, numero):
+        self.numero = numero
+        self.fechada = False
+
+    def close(self):
+        self.fechada = True
+
+
+def _pool(**kwargs):
+    criadas = []
+
+    def criar():
+        criadas.append(ConexaoFalsa(len(criadas)))
+        return criadas[-1]
+
+    return PoolConexoes(criar, **kwargs), criadas
+
+
+def test_cria_sob_demanda_e_reaproveita_a_ultima_devolvida():
+    pool, criadas = _pool(tamanho=2)
+    a = pool.obter()
+    b = pool.obter()
+    pool.devolver(a)
+    pool.devolver(b)
+    assert pool.obter() is b
+    assert len(criadas) == 2
+    assert pool.metricas()["em_uso"] == 1
+
+
+def test_espera_ate_o_timeout_com_o_pool_cheio():
+    pool, _ = _pool(tamanho=1, timeout=0.05)
+    conn = pool.obter()
+    with pytest.raises(TimeoutError):
+        pool.obter()
+    threading.Timer(0.02, pool.devolver, (conn,)).start()
+    assert pool.obter(timeout=1.0) is conn
+
+
+def test_recicla_conexao_ociosa_demais():
+    pool, criadas = _pool(tamanho=1, max_ocioso=0.01)
+    conn = pool.obter()
+    pool.devolver(conn)
+    time.sleep(0.02)
+    nova = pool.obter()
+    assert nova is not conn and conn.fechada
+    assert pool.metricas()["recicladas"] == 1
+    assert pool.metricas()["em_uso"] == 1
+
+
+def test_sem_max_ocioso_nao_recicla():
+    pool, _ = _pool(tamanho=1, max_ocioso=None)
+    conn = pool.obter()
+    pool.devolver(conn)
+    time.sleep(0.02)
+    assert pool.obter() is conn and not conn.fechada
+
+
+def test_troca_conexao_que_falha_na_verificacao():
+    def verificar(conn):
+        if conn.numero == 0:
+            raise ConnectionError("conexão perdida")
+
+    pool, criadas = _pool(tamanho=1, verificar_conexao=verificar, verificar_apos=0.0)
+    conn = pool.obter()
+    pool.devolver(conn)
+    nova = pool.obter()
+    assert nova is not conn and conn.fechada
+    assert pool.metricas()["descartadas"] == 1
+
+
+def test_descartar_libera_a_vaga():
+    pool, criadas = _pool(tamanho=1, timeout=0.05)
+    conn = pool.obter()
+    pool.devolver(conn, descartar=True)
+    assert conn.fechada
+    assert pool.obter() is not conn
+    assert pool.metricas()["em_uso"] == 1
+
+
+def test_devolver_depois_de_fechar_fecha_a_conexao():
+    pool, _ = _pool(tamanho=2)
+    livre = pool.obter()
+    em_uso = pool.obter()
+    pool.devolver(livre)
+    pool.fechar_todas()
+    assert livre.fechada
+    pool.devolver(em_uso)
+    assert em_uso.fechada
+    assert pool.metricas()["em_uso"] == 0
+    with pytest.raises(RuntimeError):
+        pool.obter()
+
+
+def test_banco_em_memoria_sobrevive_a_ociosidade():
+    db_manager = DatabaseManager("sqlite", pool_max_ocioso=0.01, pool_verificar_apos=0.0)
+    db_manager._execute_query("CREATE TABLE t (x REAL)")
+    db_manager._execute_query("INSERT INTO t VALUES (1.5)")
+    time.sleep(0.05)
+    assert db_manager.carregar_dados("t") == [(1.5,)]
+    metricas = db_manager.metricas_pool()
+    assert metricas["criadas"] == 1 and metricas["recicladas"] == 0
+    db_manager.close()
+
+
+def test_conexao_volta_ao_pool_de_origem_apos_close(tmp_path):
+    db_manager = DatabaseManager("sqlite", db_path=str(tmp_path / "banco.db"), pool_size=2)
+    conn = db_manager._get_connection()
+    pool_antigo = db_manager.connection_pool
+    db_manager.close()
+    db_manager._execute_query("CREATE TABLE t (x REAL)")  # Cria um pool novo
+    db_manager._liberar_conexao(conn)
+    assert pool_antigo.metricas()["em_uso"] == 0
+    assert db_manager.metricas_pool()["em_uso"] == 0
+    assert db_manager.metricas_pool()["livres"] == 1
+    db_manager.close()